@@ -1,4 +1,4 @@
 @echo off
 cd /d "%~dp0"
-python extract_temperature_csv.py
+python extract_minilide.py
 pause
@@ -0,0 +1,127 @@
+"""
+Plages de référence des capteurs et envoi des alertes Pushbullet.
+
+REFERENCE_TEMPS décrit les sondes de l'appareil historique (sans nom). Les
+appareils nommés déclarent leurs plages dans capteurs.json, avec les noms :
+  {"labo": {"noms": {"Capteur 1": "LABO Ambiant"}, "plages": {"Capteur 1": [15, 25]}}}
+Le client Pushbullet (appel réseau à la création) n'est créé qu'à la première
+alerte réellement envoyée.
+"""
+import json
+import os
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Plage de températures pour chaque capteur (min, max)
+REFERENCE_TEMPS = {
+    "Capteur 1": (10.0, 30.0),
+    "Capteur 2": (-30, -15),
+    "Capteur 3": (-30, -15),
+    "Capteur 4": (-25, -15),
+    "Capteur 5": (-25, -15),
+    "Capteur 6": (-110, -90),
+    "Capteur 7": (-110, -90),
+    "Capteur 8": (-110, -90),
+    "Capteur 9": (-110, -90),
+    "Capteur 10": (-110, -90),
+    "Capteur 11": (-110, -90),
+    "Capteur 12": (-110, -90),
+    "Capteur 13": (-110, -90),
+    "Capteur 14": (-110, -90),
+    "Capteur 15": (-110, -90),
+    "Capteur 16": (-110, -90)
+}
+
+CAPTEURS_PATH = "capteurs.json"
+
+_pb = None
+_pb_ready = False
+_plages_cache = {'path': None, 'mtime': None, 'plages': {}}
+
+
+def load_capteurs(path: str = CAPTEURS_PATH) -> dict:
+    """Contenu de capteurs.json ({} s'il est absent ou illisible)."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            conf = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return conf if isinstance(conf, dict) else {}
+
+def capteurs_section(conf) -> Tuple[Dict[str, str], Dict[str, list]]:
+    """
+    (noms, plages) de la section d'un appareil dans capteurs.json. Ancien format
+    accepté : la section est directement {capteur: nom}.
+    """
+    if not isinstance(conf, dict):
+        return {}, {}
+    if isinstance(conf.get("noms"), dict) or isinstance(conf.get("plages"), dict):
+        return conf.get("noms") or {}, conf.get("plages") or {}
+    return conf, {}
+
+def load_plages(path: str = CAPTEURS_PATH) -> Dict[str, Dict[str, Tuple[float, float]]]:
+    """Plages par appareil déclarées dans capteurs.json, relues seulement si le fichier change."""
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if (os.path.abspath(path), mtime) != (_plages_cache['path'], _plages_cache['mtime']):
+        plages = {}
+        for appareil, conf in load_capteurs(path).items():
+            _, section = capteurs_section(conf)
+            try:
+                plages[appareil] = {cap: (float(p[0]), float(p[1])) for cap, p in section.items()}
+            except (TypeError, ValueError, IndexError):
+                print(f"[WARN] {path} : plages de {appareil or 'Minilide'} illisibles, ignorées")
+        _plages_cache.update(path=os.path.abspath(path), mtime=mtime, plages=plages)
+    return _plages_cache['plages']
+
+def reference_range(capteur: str, position: int, appareil: str = "",
+                    plages: Optional[Dict[str, Dict[str, Tuple[float, float]]]] = None
+                    ) -> Optional[Tuple[float, float]]:
+    """
+    Plage du capteur. Appareil historique "" : capteurs.json, puis REFERENCE_TEMPS
+    par nom ou à défaut par position dans la page (0 = "Capteur 1"). Appareil
+    nommé : uniquement ses plages de capteurs.json (None = pas de plage).
+    """
+    if plages is None:
+        plages = load_plages()
+    plage = plages.get(appareil, {}).get(capteur)
+    if plage is not None or appareil:
+        return plage
+    return REFERENCE_TEMPS.get(capteur) or REFERENCE_TEMPS.get(f"Capteur {position+1}")
+
+def out_of_range_messages(appareil: str, releves) -> List[str]:
+    """Messages d'alerte pour les relevés hors de leur plage de référence."""
+    messages = []
+    prefix = f"[{appareil}] " if appareil else ""
+    plages = load_plages()
+    for i, r in enumerate(releves):
+        plage = reference_range(r.capteur, i, appareil, plages)
+        if plage is not None:
+            min_temp, max_temp = plage
+            if r.temperature < min_temp or r.temperature > max_temp:
+                messages.append(f"{prefix}{r.capteur}: {r.temperature}°C (hors plage {min_temp}-{max_temp}°C)")
+    return messages
+
+def get_pushbullet():
+    """Client Pushbullet, créé au premier appel (None si non configuré)."""
+    global _pb, _pb_ready
+    if not _pb_ready:
+        _pb_ready = True
+        try:
+            from pushbullet import Pushbullet
+            _pb = Pushbullet(os.getenv("PUSHBULLET_TOKEN"))
+        except Exception:
+            _pb = None
+    return _pb
+
+def send_alert(message: str, log: Optional[Callable[[str], None]] = None):
+    log = log or print
+    pb = get_pushbullet()
+    if pb:
+        try:
+            pb.push_note("Alerte Température Minilide", message)
+            log("Alerte envoyée via Pushbullet.")
+        except Exception as e:
+            log(f"Échec envoi Pushbullet : {e}")
+    else:
+        log("Pushbullet non configuré.")
@@ -0,0 +1,164 @@
+"""
+Détection en ligne des comportements inhabituels, capteur par capteur.
+
+Les plages fixes de REFERENCE_TEMPS ne voient pas une dégradation lente (un
+congélateur qui passe de -22 à -16 °C en une semaine reste "dans la plage").
+Pour chaque (appareil, capteur), un état de taille fixe :
+  - moyenne lente (demi-vie ANOMALY_SLOW_HOURS)
+  - moyenne rapide (demi-vie ANOMALY_FAST_HOURS) et la variance du bruit autour d'elle
+  - profil journalier : écart moyen à la moyenne lente pour chaque heure (24 cases)
+Chaque relevé est noté à son arrivée :
+  - z     : écart à (moyenne lente + profil de l'heure), en écarts-types
+  - derive: écart entre moyenne rapide et moyenne lente, en écarts-types
+puis intégré à l'état. Les pas de temps irréguliers (relevé adaptatif, trous)
+sont pris en compte dans les coefficients. L'état est conservé dans
+data/anomalies.json : un redémarrage ne rejoue jamais l'historique.
+"""
+import json
+import math
+import os
+from datetime import datetime
+from typing import Dict, List, NamedTuple
+
+ANOMALIES_PATH = os.path.join("data", "anomalies.json")
+ANOMALY_FAST_HOURS = float(os.getenv("MINILIDE_ANOMALY_FAST_HOURS", "6"))
+ANOMALY_SLOW_HOURS = float(os.getenv("MINILIDE_ANOMALY_SLOW_HOURS", "168"))
+ANOMALY_Z = float(os.getenv("MINILIDE_ANOMALY_Z", "4"))
+ANOMALY_DRIFT = float(os.getenv("MINILIDE_ANOMALY_DRIFT", "3"))
+# Apprentissage (profil journalier compris) avant de signaler quoi que ce soit
+ANOMALY_WARMUP_HOURS = float(os.getenv("MINILIDE_ANOMALY_WARMUP_HOURS", "48"))
+PROFILE_ALPHA = 0.1
+MIN_STD = 0.2  # °C : résolution des sondes, évite des z démesurés sur un signal plat
+
+
+class Score(NamedTuple):
+    appareil: str
+    capteur: str
+    timestamp: datetime
+    temperature: float
+    z: float
+    derive: float
+    anomalie: bool
+
+
+def _alpha(dt_seconds: float, half_life_hours: float) -> float:
+    if dt_seconds <= 0:
+        return 0.0
+    return 1.0 - math.exp(-dt_seconds * math.log(2) / (half_life_hours * 3600))
+
+
+class AnomalyDetector:
+    def __init__(self, path: str = ANOMALIES_PATH,
+                 fast_hours: float = ANOMALY_FAST_HOURS,
+                 slow_hours: float = ANOMALY_SLOW_HOURS,
+                 z_threshold: float = ANOMALY_Z,
+                 drift_threshold: float = ANOMALY_DRIFT,
+                 warmup_hours: float = ANOMALY_WARMUP_HOURS):
+        self.path = path
+        self.fast_hours = fast_hours
+        self.slow_hours = slow_hours
+        self.z_threshold = z_threshold
+        self.drift_threshold = drift_threshold
+        self.warmup_seconds = warmup_hours * 3600
+        self.state: Dict[str, Dict[str, dict]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {}
+
+    def _update(self, s: dict, ts: datetime, x: float, learning: bool):
+        """Note x puis l'intègre à l'état s. Retourne (z, derive)."""
+        h = ts.hour
+        dt = ts.timestamp() - s["ts"]
+        std = max(math.sqrt(s["var"]), MIN_STD)
+        expected = s["lent"] + s["profil"][h]
+        z = (x - expected) / std
+
+        # Valeur écrêtée pour l'apprentissage : une anomalie ne doit pas
+        # emporter la référence avec elle (sauf pendant l'apprentissage).
+        x_learn = x
+        if not learning:
+            limit = self.z_threshold * std
+            x_learn = min(max(x, expected - limit), expected + limit)
+        deseason = x_learn - s["profil"][h]
+
+        # Premiers relevés : moyenne simple, pour converger vite.
+        n = s["n"] + 1
+        a_fast = max(_alpha(dt, self.fast_hours), 1.0 / n)
+        a_slow = max(_alpha(dt, self.slow_hours), 1.0 / n)
+        # Variance du bruit autour de la moyenne rapide : une dérive lente
+        # n'élargit pas la tolérance.
+        noise = deseason - s["rapide"]
+        s["var"] = (1 - a_slow) * (s["var"] + a_slow * noise * noise)
+        s["rapide"] += a_fast * noise
+        s["lent"] += a_slow * (deseason - s["lent"])
+        s["profil"][h] += PROFILE_ALPHA * ((x_learn - s["lent"]) - s["profil"][h])
+        s["n"] = n
+        s["ts"] = ts.timestamp()
+
+        derive = (s["rapide"] - s["lent"]) / std
+        return z, derive
+
+    def score(self, appareil: str, releves) -> List[Score]:
+        """Note et intègre les relevés d'un appareil, dans l'ordre d'arrivée."""
+        scores = []
+        capteurs = self.state.setdefault(appareil, {})
+        for r in releves:
+            x = float(r.temperature)
+            s = capteurs.get(r.capteur)
+            if s is None:
+                capteurs[r.capteur] = {
+                    "n": 1, "debut": r.timestamp.timestamp(), "ts": r.timestamp.timestamp(),
+                    "rapide": x, "lent": x,
+                    "var": MIN_STD ** 2, "profil": [0.0] * 24,
+                    "z": 0.0, "derive": 0.0, "anomalie": False,
+                }
+                scores.append(Score(appareil, r.capteur, r.timestamp, x, 0.0, 0.0, False))
+                continue
+            if r.timestamp.timestamp() <= s["ts"]:
+                continue  # déjà intégré (relevé rejoué)
+            learning = r.timestamp.timestamp() - s["debut"] < self.warmup_seconds
+            z, derive = self._update(s, r.timestamp, x, learning)
+            anomalie = not learning and (abs(z) >= self.z_threshold or
+                                         abs(derive) >= self.drift_threshold)
+            s.update(z=round(z, 2), derive=round(derive, 2), anomalie=anomalie)
+            scores.append(Score(appareil, r.capteur, r.timestamp, x, z, derive, anomalie))
+        return scores
+
+    def alert_messages(self, scores: List[Score], previous: Dict[str, bool]) -> List[str]:
+        """Messages pour les capteurs qui viennent de devenir anormaux."""
+        messages = []
+        for sc in scores:
+            if sc.anomalie and not previous.get(sc.capteur, False):
+                prefix = f"[{sc.appareil}] " if sc.appareil else ""
+                messages.append(f"{prefix}{sc.capteur}: {sc.temperature}°C inhabituel "
+                                f"(écart {sc.z:+.1f} σ, dérive {sc.derive:+.1f} σ)")
+        return messages
+
+    def score_and_alert(self, appareil: str, releves):
+        """Note les relevés ; retourne (scores, messages d'alerte des nouvelles anomalies)."""
+        previous = {cap: s.get("anomalie", False) for cap, s in self.state.get(appareil, {}).items()}
+        scores = self.score(appareil, releves)
+        return scores, self.alert_messages(scores, previous)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def load_scores(appareil: str = "", path: str = ANOMALIES_PATH) -> Dict[str, dict]:
+    """Derniers scores par capteur, pour l'interface : {capteur: {"z", "derive", "anomalie"}}."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {cap: {k: s.get(k) for k in ("z", "derive", "anomalie")}
+            for cap, s in state.get(appareil, {}).items()}
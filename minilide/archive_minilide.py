@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Rétention et compaction des données.
+
+  python archive_minilide.py [compacter] [--appareil labo]   (défaut : tous les appareils)
+  python archive_minilide.py lire --debut 2024-01-01 --fin 2024-01-31 [--capteur "Capteur 2"]
+
+compacter :
+  - les mois clos (plus anciens que ARCHIVE_KEEP_MONTHS mois) sont fusionnés dans
+    une archive annuelle data/archives/temperatures_YYYY.arc, puis leur CSV est supprimé ;
+  - au-delà de RAW_RETENTION_DAYS jours, les relevés bruts sont remplacés par des
+    agrégats horaires (n / min / max / moyenne) ;
+  - les rapports PDF mensuels de plus de REPORT_RETENTION_MONTHS mois sont supprimés.
+
+Une archive est une suite de blocs compressés (zlib), un bloc par capteur et par
+jour, et un index temperatures_YYYY.idx.json : {niveau: {capteur: {jour: [offset, taille, n]}}}.
+Une lecture ne décompresse que les blocs des jours demandés.
+L'index désigne aussi le fichier de blocs ("fichier") : une réécriture produit un
+nouveau temperatures_YYYY.<génération>.arc, et c'est l'enregistrement de l'index
+qui bascule de l'ancien au nouveau ; un arrêt à n'importe quel moment laisse un
+index cohérent avec son fichier.
+"""
+import argparse
+import csv
+import glob
+import io
+import json
+import os
+import re
+import sys
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from collecteur_minilide import load_appareils
+from journal_minilide import PARTITION_LOCK_WAIT, PartitionLocked, acquire_partition_lock, release_lock
+from stockage_minilide import COLUMNS, appareil_dir, month_csv_path, read_csv_safe
+
+ARCHIVE_KEEP_MONTHS = int(os.getenv("MINILIDE_ARCHIVE_KEEP_MONTHS", "1"))
+RAW_RETENTION_DAYS = int(os.getenv("MINILIDE_RAW_RETENTION_DAYS", "730"))
+REPORT_RETENTION_MONTHS = int(os.getenv("MINILIDE_REPORT_RETENTION_MONTHS", "24"))
+
+RAW = "raw"
+HOURLY = "hourly"
+
+MONTH_FILE = re.compile(r"temperatures_(\d{2})-(\d{4})\.csv$")
+REPORT_FILE = re.compile(r"rapport_temp_(\d{2})-(\d{4})\.pdf$")
+
+
+def archive_dir(appareil: str = "") -> str:
+    return os.path.join(appareil_dir(appareil), "archives")
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + month - 1
+
+
+class YearArchive:
+    """Archive annuelle d'un appareil : blocs compressés + index par capteur et par jour."""
+
+    def __init__(self, year: int, appareil: str = ""):
+        self.year = year
+        self.base = os.path.join(archive_dir(appareil), f"temperatures_{year}")
+        self.index_path = self.base + ".idx.json"
+        self.index = {RAW: {}, HOURLY: {}, "fichier": os.path.basename(self.base) + ".arc"}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index.update(json.load(f))
+
+    @property
+    def path(self) -> str:
+        return os.path.join(os.path.dirname(self.base), self.index["fichier"])
+
+    @classmethod
+    def existing_years(cls, appareil: str = "") -> List[int]:
+        years = []
+        for p in glob.glob(os.path.join(archive_dir(appareil), "temperatures_*.idx.json")):
+            m = re.search(r"temperatures_(\d{4})\.idx\.json$", p)
+            if m:
+                years.append(int(m.group(1)))
+        return sorted(years)
+
+    def capteurs(self, niveau: str = RAW) -> List[str]:
+        return sorted(self.index[niveau])
+
+    def days(self, niveau: str, capteur: str) -> List[str]:
+        return sorted(self.index[niveau].get(capteur, {}))
+
+    def read_block(self, niveau: str, capteur: str, day: str) -> List[List[str]]:
+        entry = self.index[niveau].get(capteur, {}).get(day)
+        if entry is None:
+            return []
+        offset, size, _ = entry
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            raw = zlib.decompress(f.read(size)).decode("utf-8")
+        return list(csv.reader(io.StringIO(raw)))
+
+    def write_blocks(self, niveau: str, blocks: Dict[Tuple[str, str], Iterable[Iterable]]):
+        """
+        Ajoute des blocs {(capteur, jour): lignes} en fin d'archive. Un bloc déjà
+        présent est fusionné avec le nouveau (les anciens octets deviennent inutilisés) :
+        relevé brut remplacé à horodatage égal, agrégats horaires combinés.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "ab") as f:
+            for (capteur, day), rows in blocks.items():
+                merged = {r[0]: list(r) for r in self.read_block(niveau, capteur, day)}
+                for r in rows:
+                    r = [str(v) for v in r]
+                    if niveau == HOURLY and r[0] in merged:
+                        r = _combine_hours(merged[r[0]], r)
+                    merged[r[0]] = r
+                buf = io.StringIO()
+                csv.writer(buf, lineterminator="\n").writerows(merged[k] for k in sorted(merged))
+                data = zlib.compress(buf.getvalue().encode("utf-8"), 6)
+                offset = f.seek(0, os.SEEK_END)
+                f.write(data)
+                self.index[niveau].setdefault(capteur, {})[day] = [offset, len(data), len(merged)]
+            f.flush()
+            os.fsync(f.fileno())
+        self.save_index()
+
+    def drop(self, niveau: str, capteur: str, day: str):
+        self.index[niveau].get(capteur, {}).pop(day, None)
+
+    def save_index(self):
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def rewrite(self):
+        """
+        Recopie les seuls blocs indexés (sans les décompresser) dans un nouveau
+        fichier pour récupérer la place, puis bascule l'index dessus.
+        """
+        old_path = self.path
+        m = re.search(r"\.(\d+)\.arc$", old_path)
+        generation = int(m.group(1)) + 1 if m else 1
+        new_name = f"{os.path.basename(self.base)}.{generation}.arc"
+        new_path = os.path.join(os.path.dirname(self.base), new_name)
+
+        new_index = {RAW: {}, HOURLY: {}, "fichier": new_name}
+        with open(old_path, "rb") as src, open(new_path, "wb") as dst:
+            for niveau in (RAW, HOURLY):
+                for capteur, days in self.index[niveau].items():
+                    for day, (offset, size, n) in sorted(days.items()):
+                        src.seek(offset)
+                        new_index[niveau].setdefault(capteur, {})[day] = [dst.tell(), size, n]
+                        dst.write(src.read(size))
+            dst.flush()
+            os.fsync(dst.fileno())
+        self.index = new_index
+        self.save_index()
+        # Anciennes générations (et restes d'une réécriture interrompue) : plus référencées.
+        for p in glob.glob(glob.escape(self.base) + "*.arc"):
+            if os.path.basename(p) != new_name:
+                os.remove(p)
+
+
+def _combine_hours(a: List[str], b: List[str]) -> List[str]:
+    """Deux agrégats (heure, n, min, max, moyenne) d'une même heure en un seul."""
+    n1, n2 = int(a[1]), int(b[1])
+    mean = (float(a[4]) * n1 + float(b[4]) * n2) / (n1 + n2)
+    return [a[0], str(n1 + n2), str(min(float(a[2]), float(b[2]))),
+            str(max(float(a[3]), float(b[3]))), str(round(mean, 3))]
+
+
+# --- Compaction --------------------------------------------------------------
+
+def archive_month(path: str, appareil: str = "", wait_seconds: float = PARTITION_LOCK_WAIT) -> int:
+    """
+    Verse un CSV mensuel dans les archives annuelles puis le supprime. Retourne le nb de lignes.
+    Sous le verrou de la partition : un import ne peut pas y ajouter de lignes
+    entre la lecture et la suppression. Lève PartitionLocked.
+    """
+    lock = acquire_partition_lock(path, wait_seconds)
+    try:
+        return _archive_month(path, appareil)
+    finally:
+        release_lock(lock)
+
+def _archive_month(path: str, appareil: str) -> int:
+    if not os.path.exists(path):
+        return 0  # déjà archivé par un autre passage
+    df = read_csv_safe(path).dropna(subset=["timestamp"])
+    df = df.assign(capteur=df["capteur"].astype(str),
+                   temperature=pd.to_numeric(df["temperature"], errors="coerce"))
+
+    by_year: Dict[int, Dict[Tuple[str, str], list]] = {}
+    groups = df.groupby(["capteur", df["timestamp"].dt.date]) if not df.empty else []
+    for (capteur, day), part in groups:
+        rows = [(ts.isoformat(sep=" "), "" if pd.isna(temp) else temp)
+                for ts, temp in zip(part["timestamp"], part["temperature"])]
+        by_year.setdefault(day.year, {})[(capteur, day.isoformat())] = rows
+
+    for year, blocks in by_year.items():
+        YearArchive(year, appareil).write_blocks(RAW, blocks)
+    os.remove(path)
+    return len(df)
+
+def closed_months(appareil: str = "", now: Optional[datetime] = None,
+                  keep_months: int = ARCHIVE_KEEP_MONTHS) -> List[str]:
+    """CSV mensuels plus anciens que le mois courant moins keep_months."""
+    now = now or datetime.now()
+    limit = _month_index(now.year, now.month) - keep_months
+    months = []
+    for p in glob.glob(os.path.join(appareil_dir(appareil), "temperatures_*-*.csv")):
+        m = MONTH_FILE.search(p)
+        if m and _month_index(int(m.group(2)), int(m.group(1))) < limit:
+            months.append((_month_index(int(m.group(2)), int(m.group(1))), p))
+    return [p for _, p in sorted(months)]
+
+def downsample(appareil: str = "", before: Optional[date] = None) -> int:
+    """Remplace les relevés bruts antérieurs à `before` par des agrégats horaires."""
+    before = before or (datetime.now().date() - timedelta(days=RAW_RETENTION_DAYS))
+    cutoff = before.isoformat()
+    n_days = 0
+    for year in YearArchive.existing_years(appareil):
+        if year > before.year:
+            continue
+        arc = YearArchive(year, appareil)
+        blocks = {}
+        for capteur in arc.capteurs(RAW):
+            for day in arc.days(RAW, capteur):
+                if day >= cutoff:
+                    continue
+                hours: Dict[str, List[float]] = {}
+                for ts, temp in arc.read_block(RAW, capteur, day):
+                    if temp != "":
+                        hours.setdefault(ts[:13] + ":00:00", []).append(float(temp))
+                blocks[(capteur, day)] = [
+                    (h, len(v), min(v), max(v), round(sum(v) / len(v), 3))
+                    for h, v in sorted(hours.items())
+                ]
+        if not blocks:
+            continue
+        arc.write_blocks(HOURLY, blocks)
+        for capteur, day in blocks:
+            arc.drop(RAW, capteur, day)
+        arc.rewrite()
+        n_days += len(blocks)
+    return n_days
+
+def purge_reports(now: Optional[datetime] = None, keep_months: int = REPORT_RETENTION_MONTHS) -> List[str]:
+    now = now or datetime.now()
+    limit = _month_index(now.year, now.month) - keep_months
+    removed = []
+    for p in glob.glob(os.path.join("data", "rapport_temp_*-*.pdf")):
+        m = REPORT_FILE.search(p)
+        if m and _month_index(int(m.group(2)), int(m.group(1))) < limit:
+            os.remove(p)
+            removed.append(p)
+    return removed
+
+def known_appareils() -> List[str]:
+    """
+    Appareils à compacter : l'appareil historique "", ceux de MINILIDE_APPAREILS
+    et les dossiers data/<nom>/ qui ont des CSV mensuels ou des archives (un
+    appareil retiré de la configuration garde ses données).
+    """
+    noms = {""} | {nom for nom, _ in load_appareils()}
+    for d in glob.glob(os.path.join("data", "*", "")):
+        nom = os.path.basename(os.path.dirname(d))
+        if nom == "archives":
+            continue
+        if glob.glob(os.path.join(d, "temperatures_*-*.csv")) or os.path.isdir(os.path.join(d, "archives")):
+            noms.add(nom)
+    return sorted(noms)
+
+def compact(appareil: Optional[str] = None, now: Optional[datetime] = None):
+    """Compaction d'un appareil, ou de tous les appareils connus si appareil est None."""
+    now = now or datetime.now()
+    for nom in known_appareils() if appareil is None else [appareil]:
+        _compact_appareil(nom, now)
+    for p in purge_reports(now):
+        print(f"[OK] {p} supprimé (rétention)")
+
+def _compact_appareil(appareil: str, now: datetime):
+    for path in closed_months(appareil, now):
+        try:
+            n = archive_month(path, appareil)
+        except PartitionLocked as e:
+            print(f"[WARN] {e} Archivage reporté au prochain passage.")
+            continue
+        print(f"[OK] {path} archivé ({n} lignes)")
+    n_days = downsample(appareil, now.date() - timedelta(days=RAW_RETENTION_DAYS))
+    if n_days:
+        print(f"[OK] {appareil_dir(appareil)} : {n_days} jours-capteur agrégés par heure")
+
+
+# --- Lecture -----------------------------------------------------------------
+
+def read_range(start: datetime, end: datetime, capteur: Optional[str] = None,
+               appareil: str = "") -> pd.DataFrame:
+    """
+    Relevés entre start et end (inclus), archives et CSV mensuels confondus.
+    Au-delà de la rétention des données brutes, on renvoie la moyenne horaire.
+    Un mois archivé peut avoir de nouveau un CSV (import tardif, archivage
+    interrompu) : il est toujours lu, et un relevé présent des deux côtés
+    n'est renvoyé qu'une fois (celui du CSV).
+    """
+    rows = []
+    day = start.date()
+    archives: Dict[int, YearArchive] = {}
+    while day <= end.date():
+        if day.year not in archives:
+            archives[day.year] = YearArchive(day.year, appareil)
+        arc = archives[day.year]
+        key = day.isoformat()
+        capteurs = [capteur] if capteur else sorted(set(arc.capteurs(RAW)) | set(arc.capteurs(HOURLY)))
+        for cap in capteurs:
+            raw = arc.read_block(RAW, cap, key)
+            if raw:
+                rows.extend((ts, cap, temp) for ts, temp in raw)
+            else:
+                rows.extend((r[0], cap, r[4]) for r in arc.read_block(HOURLY, cap, key))
+        day += timedelta(days=1)
+
+    df = pd.DataFrame(rows, columns=COLUMNS)
+
+    # CSV mensuels, archivés ou non.
+    month = date(start.year, start.month, 1)
+    parts = [df]
+    while month <= end.date():
+        part = read_csv_safe(month_csv_path(month, appareil))
+        if not part.empty and capteur:
+            part = part[part["capteur"].astype(str) == capteur]
+        parts.append(part)
+        month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=COLUMNS)
+    df = pd.concat(parts, ignore_index=True)
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    df["temperature"] = pd.to_numeric(df["temperature"], errors="coerce")
+    df["capteur"] = df["capteur"].astype(str)
+    df = df[(df["timestamp"] >= start) & (df["timestamp"] <= end)]
+    df = df.drop_duplicates(subset=["timestamp", "capteur"], keep="last")
+    return df.sort_values(["timestamp", "capteur"]).reset_index(drop=True)
+
+def read_at(ts: datetime, capteur: str, appareil: str = "") -> Optional[Tuple[datetime, float]]:
+    """Dernier relevé d'un capteur à l'instant ts (recherche sur la veille au plus)."""
+    df = read_range(ts - timedelta(days=1), ts, capteur, appareil)
+    df = df.dropna(subset=["timestamp"])
+    if df.empty:
+        return None
+    last = df.iloc[-1]
+    return last["timestamp"].to_pydatetime(), float(last["temperature"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rétention et archives des températures Minilide.")
+    parser.add_argument("commande", nargs="?", default="compacter", choices=["compacter", "lire"])
+    parser.add_argument("--appareil", default=None,
+                        help="appareil (compacter : défaut tous ; lire : défaut appareil historique)")
+    parser.add_argument("--debut", help="lire : début (YYYY-MM-DD[ HH:MM])")
+    parser.add_argument("--fin", help="lire : fin (YYYY-MM-DD[ HH:MM]), défaut : fin du jour de début")
+    parser.add_argument("--capteur", help="lire : un seul capteur")
+    args = parser.parse_args()
+
+    if args.commande == "compacter":
+        compact(args.appareil)
+        return
+
+    if not args.debut:
+        parser.error("lire : --debut est requis")
+    start = datetime.fromisoformat(args.debut)
+    end = datetime.fromisoformat(args.fin) if args.fin else datetime.combine(start.date(), datetime.max.time())
+    if args.fin and len(args.fin) == 10:
+        end = datetime.combine(end.date(), datetime.max.time())
+    read_range(start, end, args.capteur, args.appareil or "").to_csv(sys.stdout, index=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Collecte des températures sur un parc d'appareils Minilide.
+
+La collecte est découpée en deux étages reliés par des files bornées :
+  - récupération HTTP des pages (threads, limitée par les E/S réseau)
+  - analyse HTML BeautifulSoup (pool de processus, limitée par le CPU / GIL)
+
+Quand une file est pleine, l'étage amont se bloque (contre-pression) : la mémoire
+reste bornée quel que soit le nombre d'appareils.
+Les relevés sont renvoyés sous forme de tuples compacts (Releve), pas de DataFrames.
+BeautifulSoup et le pool de processus ne sont importés qu'au premier usage,
+pour que le relevé ponctuel (extract_minilide.py) démarre vite. Le pool est
+ensuite gardé d'un relevé à l'autre (monitoring H24).
+"""
+import os
+import re
+import queue
+import threading
+import urllib.request
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from profiling_minilide import profiled
+
+MINILIDE_URL = os.getenv("MINILIDE_URL", "http://192.168.10.107")
+FETCH_TIMEOUT = 5  # secondes
+FETCH_WORKERS = int(os.getenv("MINILIDE_FETCH_WORKERS", "8"))
+PARSE_WORKERS = int(os.getenv("MINILIDE_PARSE_WORKERS", str(os.cpu_count() or 1)))
+QUEUE_SIZE = int(os.getenv("MINILIDE_QUEUE_SIZE", "32"))
+
+
+class Releve(NamedTuple):
+    """Un relevé de température (appareil "" = appareil historique unique)."""
+    appareil: str
+    timestamp: datetime
+    capteur: str
+    temperature: float
+
+
+_MIN_INTERVAL = re.compile(r"@(\d+(?:\.\d+)?)\s*(s|min|m)?$", re.I)
+
+
+def _iter_appareils(spec: str) -> Iterator[Tuple[str, str, Optional[float]]]:
+    """(nom, url, intervalle minimal en secondes ou None) de chaque entrée de spec."""
+    for i, item in enumerate(spec.split(","), start=1):
+        item = item.strip()
+        if not item:
+            continue
+        min_seconds = None
+        m = _MIN_INTERVAL.search(item)
+        if m:
+            min_seconds = float(m.group(1)) * (60 if (m.group(2) or "s").lower() != "s" else 1)
+            item = item[:m.start()].strip()
+        if "=" in item:
+            nom, url = item.split("=", 1)
+        else:
+            nom, url = f"appareil{i}", item
+        yield nom.strip(), url.strip(), min_seconds
+
+
+def parse_appareils(spec: Optional[str], default_url: str) -> List[Tuple[str, str]]:
+    """
+    Liste des appareils à interroger, au format "nom=url,nom2=url2".
+    Un suffixe "@60s" (ou "@2m") fixe l'intervalle minimal de relevé de
+    l'appareil (voir parse_min_intervals) ; il ne fait pas partie de l'URL.
+    Sans configuration : un seul appareil sans nom sur default_url.
+    """
+    if not spec or not spec.strip():
+        return [("", default_url)]
+    return [(nom, url) for nom, url, _ in _iter_appareils(spec)]
+
+
+def parse_min_intervals(spec: Optional[str]) -> Dict[str, float]:
+    """Intervalles minimaux par appareil (suffixe "@60s" de MINILIDE_APPAREILS)."""
+    if not spec or not spec.strip():
+        return {}
+    return {nom: s for nom, _, s in _iter_appareils(spec) if s is not None}
+
+
+def load_appareils() -> List[Tuple[str, str]]:
+    """Parc configuré par MINILIDE_APPAREILS (défaut : MINILIDE_URL seul)."""
+    return parse_appareils(os.getenv("MINILIDE_APPAREILS"), MINILIDE_URL)
+
+
+def load_min_intervals() -> Dict[str, float]:
+    """Intervalles minimaux de relevé configurés dans MINILIDE_APPAREILS."""
+    return parse_min_intervals(os.getenv("MINILIDE_APPAREILS"))
+
+
+@profiled()
+def extract_name_temp_from_html(html: str):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    pairs = []
+    temp_nodes = soup.find_all(string=re.compile(r"[-+]?\d{1,3}[.,]?\d*\s*°\s*C", re.I))
+    for tnode in temp_nodes:
+        try:
+            temp = float(re.sub(r"[^\d\-,.]", "", tnode).replace(",", "."))
+        except Exception:
+            continue
+
+        name = None
+
+        card = tnode.find_parent(["div","td","span","li","section","article"])
+        if card:
+            title = (card.find(["h1","h2","h3","h4","h5","h6"]) or
+                     card.find(["strong","b"]))
+            if title and title.get_text(strip=True):
+                name = title.get_text(" ", strip=True)
+
+            if not name:
+                texts = [x.strip() for x in card.stripped_strings]
+                if len(texts) >= 2 and any("°" in s for s in texts):
+                    try:
+                        idx = max(i for i,s in enumerate(texts) if "°" in s)
+                    except ValueError:
+                        idx = -1
+                    label_parts = [s for s in texts[:idx] if "°" not in s]
+                    if label_parts:
+                        name = " ".join(label_parts).strip()
+
+        pairs.append((name, temp))
+
+    for tr in soup.select("table tr"):
+        tds = [td.get_text(" ", strip=True) for td in tr.select("td")]
+        if len(tds) >= 2 and re.search(r"°\s*C", tds[1]):
+            try:
+                temp = float(re.sub(r"[^\d\-,.]", "", tds[1]).replace(",", "."))
+                name = tds[0] or None
+                pairs.append((name, temp))
+            except Exception:
+                pass
+
+    seen = set()
+    uniq = []
+    for name, temp in pairs:
+        key = (name or "", temp)
+        if key not in seen:
+            seen.add(key)
+            uniq.append((name, temp))
+    return uniq
+
+
+def parse_page(appareil: str, html: str, timestamp: datetime) -> List[Releve]:
+    """Étage d'analyse : HTML -> relevés. Exécuté dans un processus du pool."""
+    pairs = extract_name_temp_from_html(html)
+    values = [(n, v) for (n, v) in pairs if isinstance(v, (int, float))]
+    return [
+        Releve(appareil, timestamp, (name or f"Capteur {i+1}").strip(), float(temp))
+        for i, (name, temp) in enumerate(values)
+    ]
+
+
+def fetch_page(url: str) -> str:
+    # urllib plutôt que requests : une page, pas de session, import quasi gratuit.
+    # Les codes HTTP >= 400 lèvent HTTPError.
+    with urllib.request.urlopen(url, timeout=FETCH_TIMEOUT) as response:
+        return decode_page(response.read(), response.headers.get_content_charset())
+
+
+def decode_page(body: bytes, charset: Optional[str] = None) -> str:
+    """
+    Décode une page selon le charset annoncé. Sans charset : UTF-8 strict, puis
+    ISO-8859-1 (le défaut HTTP, celui de requests) si la page n'est pas en
+    UTF-8 : un "°" en Latin-1 (0xB0) ne doit pas devenir "\ufffd" et faire
+    échouer la regex des températures.
+    """
+    if charset:
+        try:
+            return body.decode(charset, errors="replace")
+        except LookupError:
+            pass  # charset inconnu : on devine comme s'il était absent
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode("iso-8859-1")
+
+
+def _default_on_error(appareil: str, exc: Exception):
+    print(f" Échec collecte {appareil or 'Minilide'} : {exc}")
+
+
+_FIN = object()
+
+_parse_pool = None
+_parse_pool_workers = 0
+
+
+def get_parse_pool(workers: int = PARSE_WORKERS):
+    """
+    Pool de processus d'analyse, créé au premier usage puis réutilisé.
+    Processus démarrés en "spawn" : un fork après le démarrage des threads de
+    récupération copierait leurs verrous dans un état incohérent. Les processus
+    réimportent le script principal sous le nom __mp_main__ : il ne doit rien
+    initialiser hors de son bloc if __name__ == "__main__".
+    """
+    global _parse_pool, _parse_pool_workers
+    if _parse_pool is None or _parse_pool_workers != workers:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        shutdown_parse_pool()
+        _parse_pool = ProcessPoolExecutor(max_workers=workers,
+                                          mp_context=multiprocessing.get_context("spawn"))
+        _parse_pool_workers = workers
+    return _parse_pool
+
+
+def shutdown_parse_pool():
+    """Arrête le pool d'analyse (il sera recréé au prochain usage)."""
+    global _parse_pool, _parse_pool_workers
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+    _parse_pool, _parse_pool_workers = None, 0
+
+
+def collect(appareils: List[Tuple[str, str]],
+            fetch_workers: int = FETCH_WORKERS,
+            parse_workers: int = PARSE_WORKERS,
+            queue_size: int = QUEUE_SIZE,
+            on_error: Callable[[str, Exception], None] = _default_on_error,
+            ) -> Iterator[Tuple[str, List[Releve]]]:
+    """
+    Interroge tous les appareils et renvoie (appareil, relevés) au fil de l'eau.
+    Un appareil injoignable ou une page illisible est signalé via on_error
+    et n'interrompt pas la collecte des autres.
+    """
+    # Un seul appareil (ou pas de pool demandé) : pas de processus à démarrer.
+    if parse_workers <= 1 or len(appareils) <= 1:
+        for nom, url in appareils:
+            try:
+                html = fetch_page(url)
+                ts = datetime.now()
+                releves = parse_page(nom, html, ts)
+            except Exception as e:
+                on_error(nom, e)
+                continue
+            yield nom, releves
+        return
+
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    from concurrent.futures.process import BrokenProcessPool
+
+    # Pool obtenu avant de lancer les threads de récupération.
+    pool = get_parse_pool(parse_workers)
+    queue_size = max(1, queue_size)
+    pages = queue.Queue(maxsize=queue_size)
+
+    def fetch_one(appareil):
+        nom, url = appareil
+        try:
+            html = fetch_page(url)
+        except Exception as e:
+            pages.put((nom, None, None, e))
+            return
+        pages.put((nom, html, datetime.now(), None))
+
+    def producer():
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, fetch_workers)) as ex:
+                list(ex.map(fetch_one, appareils))
+        finally:
+            pages.put(_FIN)
+
+    threading.Thread(target=producer, name="minilide-fetch", daemon=True).start()
+
+    def results(done, in_flight):
+        for fut in done:
+            nom = in_flight.pop(fut)
+            try:
+                yield nom, fut.result()
+            except BrokenProcessPool as e:
+                shutdown_parse_pool()  # processus tué : pool neuf au prochain relevé
+                on_error(nom, e)
+            except Exception as e:
+                on_error(nom, e)
+
+    in_flight = {}
+    while True:
+        item = pages.get()
+        if item is _FIN:
+            break
+        nom, html, ts, err = item
+        if err is not None:
+            on_error(nom, err)
+            continue
+        # Pas plus de queue_size pages en cours d'analyse.
+        if len(in_flight) >= queue_size:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            yield from results(done, in_flight)
+        try:
+            in_flight[pool.submit(parse_page, nom, html, ts)] = nom
+        except BrokenProcessPool:
+            # Pool cassé en cours de relevé : le reste est analysé ici.
+            shutdown_parse_pool()
+            try:
+                yield nom, parse_page(nom, html, ts)
+            except Exception as e:
+                on_error(nom, e)
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        yield from results(done, in_flight)
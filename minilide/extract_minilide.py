@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Relevé ponctuel, lancé par cron / le planificateur de tâches (install_cron.sh).
+
+Un passage : interrogation des appareils, écriture des relevés (journal puis CSV
+mensuel, sans pandas), anneau des derniers relevés, complétude, anomalies,
+synthèse du parc, alertes.
+Pour démarrer vite sur les petits postes, rien de lourd n'est importé d'avance :
+BeautifulSoup au moment d'analyser la page, Pushbullet seulement s'il y a une
+alerte à envoyer. Objectif : ~100 ms du lancement du script à l'écriture des
+relevés, dont ~40 ms d'import de BeautifulSoup et ~20 ms d'urllib (démarrage de
+l'interpréteur non compté). Au-delà de MINILIDE_STARTUP_BUDGET_MS (150 ms par
+défaut), un avertissement est affiché : un import lourd (pandas, requests,
+Pushbullet) réintroduit au démarrage le fait dépasser.
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+T0 = time.perf_counter()
+
+STARTUP_BUDGET_MS = float(os.getenv("MINILIDE_STARTUP_BUDGET_MS", "150"))
+# Cadence du cron : sert à savoir quand le relevé suivant est attendu
+CRON_MINUTES = float(os.getenv("MINILIDE_CRON_MINUTES", "15"))
+
+
+def load_env_file(path: str = ".env"):
+    """Lecture minimale du .env (CLE=valeur), sans dépendre de python-dotenv."""
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            key = key.strip()
+            if key.startswith("export "):
+                key = key[len("export "):].strip()
+            os.environ.setdefault(key, value.strip().strip("'\""))
+
+def main() -> int:
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    load_env_file()
+
+    # Imports après le .env : les modules lisent leur configuration à l'import.
+    from alertes_minilide import out_of_range_messages, send_alert
+    from anomalies_minilide import AnomalyDetector
+    from collecteur_minilide import collect, load_appareils
+    from flotte_minilide import FleetSummary
+    from gaps_minilide import GapDetector
+    from journal_minilide import JournalLocked, WriteAheadBuffer
+    from ring_minilide import RingWriter
+    from stockage_minilide import refresh_mirror
+
+    # Verrou pris avant de lire le moindre état partagé.
+    try:
+        journal = WriteAheadBuffer()
+    except JournalLocked as e:
+        print(f" Relevé ignoré : {e}")
+        return 2
+    journal.replay()
+    gaps = GapDetector()
+    anomalies = AnomalyDetector()
+    fleet = FleetSummary()
+    ring = None
+
+    alert_messages = []
+    events = []
+    collected = 0
+
+    def on_error(appareil, e):
+        print(f" Échec : Impossible de contacter le Minilide {appareil} ({e})".rstrip())
+        now = datetime.now()
+        events.extend(gaps.record_poll(appareil, [], now, now + timedelta(minutes=CRON_MINUTES)))
+
+    for appareil, releves in collect(load_appareils(), on_error=on_error):
+        now = datetime.now()
+        events.extend(gaps.record_poll(appareil, releves, now, now + timedelta(minutes=CRON_MINUTES)))
+        if not releves:
+            print(" Aucune température détectée dans la page HTML.")
+            continue
+        journal.append(releves)
+        try:
+            ring = ring or RingWriter()
+            ring.write(releves)
+        except Exception as e:
+            print(f" Écriture de l'anneau des derniers relevés échouée : {e}")
+        alert_messages.extend(out_of_range_messages(appareil, releves))
+        scores, anomaly_messages = anomalies.score_and_alert(appareil, releves)
+        events.extend(anomaly_messages)
+        fleet.update(appareil, releves, scores)
+        collected += len(releves)
+
+    written = journal.commit()
+    journal.close()
+    for path in written:
+        try:
+            refresh_mirror(path)
+        except Exception as e:
+            print(f" Copie vers le miroir de {path} échouée : {e}")
+    gaps.save()
+    anomalies.save()
+    fleet.mark_stale(gaps.stale_sensors(), gaps.unreachable_devices())
+    fleet.save()
+
+    elapsed_ms = (time.perf_counter() - T0) * 1000
+    print(f" Températures enregistrées : {collected} relevés ({elapsed_ms:.0f} ms)")
+    if elapsed_ms > STARTUP_BUDGET_MS:
+        print(f" [WARN] Budget de démarrage dépassé : {elapsed_ms:.0f} ms > {STARTUP_BUDGET_MS:.0f} ms")
+
+    if alert_messages or events:
+        send_alert("\n".join(alert_messages + events))
+
+    return 0 if collected else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Synthèse du parc pour la vue d'ensemble de l'interface (page /parc).
+
+Tenue à jour par le collecteur à chaque relevé (monitoring, relevé ponctuel),
+pour que l'interface n'ait rien à recalculer ni à relire dans les CSV.
+Par (appareil, capteur) :
+  - dernier relevé et statut (ok, hors plage, anomalie, muet)
+  - nombre d'excursions hors plage par jour, sur FLEET_DAYS jours
+  - moyennes horaires des FLEET_SPARK_HOURS dernières heures (tendance)
+État dans data/flotte.json ; noms des capteurs par appareil dans capteurs.json
+(optionnel).
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from alertes_minilide import CAPTEURS_PATH, capteurs_section, load_capteurs, load_plages, reference_range
+
+FLEET_PATH = os.path.join("data", "flotte.json")
+NOMS_PATH = CAPTEURS_PATH
+FLEET_DAYS = int(os.getenv("MINILIDE_FLEET_DAYS", "7"))
+FLEET_SPARK_HOURS = int(os.getenv("MINILIDE_FLEET_SPARK_HOURS", "24"))
+
+# Ordre d'affichage : ce qui demande une action d'abord
+STATUTS = ("hors plage", "muet", "anomalie", "ok")
+
+
+class FleetSummary:
+    def __init__(self, path: str = FLEET_PATH):
+        self.path = path
+        self.state: Dict[str, Dict[str, dict]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.state = json.load(f)
+            except (OSError, ValueError):
+                self.state = {}
+
+    def update(self, appareil: str, releves, scores: Iterable = ()):
+        """Intègre les relevés d'un appareil (et leurs scores d'anomalie)."""
+        anormaux = {sc.capteur for sc in scores if sc.anomalie}
+        capteurs = self.state.setdefault(appareil, {})
+        plages = load_plages()
+        for i, r in enumerate(releves):
+            c = capteurs.setdefault(r.capteur, {
+                "ts": None, "temp": None, "hors_plage": False, "anomalie": False,
+                "muet": False, "excursions": {}, "heures": [],
+            })
+            plage = reference_range(r.capteur, i, appareil, plages)
+            hors_plage = plage is not None and not (plage[0] <= r.temperature <= plage[1])
+            if hors_plage and not c["hors_plage"]:
+                day = r.timestamp.date().isoformat()
+                c["excursions"][day] = c["excursions"].get(day, 0) + 1
+            c.update(ts=r.timestamp.isoformat(timespec="seconds"), temp=r.temperature,
+                     hors_plage=hors_plage, anomalie=r.capteur in anormaux, muet=False)
+
+            # Moyenne horaire : [début de l'heure (epoch), somme, nombre]
+            hour = int(r.timestamp.timestamp()) // 3600 * 3600
+            heures = c["heures"]
+            if heures and heures[-1][0] == hour:
+                heures[-1][1] = round(heures[-1][1] + r.temperature, 2)
+                heures[-1][2] += 1
+            elif not heures or heures[-1][0] < hour:
+                heures.append([hour, r.temperature, 1])
+            cutoff = hour - FLEET_SPARK_HOURS * 3600
+            while heures and heures[0][0] <= cutoff:
+                heures.pop(0)
+
+    def mark_stale(self, capteurs: Iterable[Tuple[str, str]], appareils: Iterable[str] = ()):
+        """Capteurs muets et appareils injoignables (voir GapDetector)."""
+        muets = set(capteurs)
+        injoignables = set(appareils)
+        for app, caps in self.state.items():
+            for cap, c in caps.items():
+                c["muet"] = app in injoignables or (app, cap) in muets
+
+    def save(self):
+        cutoff = date.fromordinal(date.today().toordinal() - FLEET_DAYS + 1).isoformat()
+        for caps in self.state.values():
+            for c in caps.values():
+                for day in [d for d in c["excursions"] if d < cutoff]:
+                    del c["excursions"][day]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def statut(c: dict) -> str:
+    if c.get("hors_plage"):
+        return "hors plage"
+    if c.get("muet"):
+        return "muet"
+    if c.get("anomalie"):
+        return "anomalie"
+    return "ok"
+
+def load_noms(path: str = NOMS_PATH) -> Dict[str, Dict[str, str]]:
+    """Noms des capteurs par appareil : {"appareil": {"Capteur 1": "LABO Ambiant"}}."""
+    return {app: capteurs_section(conf)[0] for app, conf in load_capteurs(path).items()}
+
+def fleet_rows(path: str = FLEET_PATH, now: Optional[datetime] = None) -> List[dict]:
+    """
+    Une ligne par capteur du parc, triée par statut puis appareil / capteur :
+    appareil, capteur, ts, temp, statut, excursions (sur FLEET_DAYS jours),
+    tendance (moyennes horaires des FLEET_SPARK_HOURS dernières heures, None si aucun relevé).
+    """
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return []
+
+    now = now or datetime.now()
+    end = int(now.timestamp()) // 3600 * 3600
+    start = end - (FLEET_SPARK_HOURS - 1) * 3600
+    cutoff = date.fromordinal(now.date().toordinal() - FLEET_DAYS + 1).isoformat()
+    rows = []
+    for app, caps in state.items():
+        for cap, c in caps.items():
+            moyennes = {h: s / n for h, s, n in c["heures"] if n}
+            rows.append({
+                "appareil": app,
+                "capteur": cap,
+                "ts": c["ts"],
+                "temp": c["temp"],
+                "statut": statut(c),
+                "excursions": sum(n for d, n in c["excursions"].items() if d >= cutoff),
+                "tendance": [moyennes.get(h) for h in range(start, end + 1, 3600)],
+            })
+
+    def num(capteur):
+        digits = "".join(ch for ch in capteur if ch.isdigit())
+        return int(digits) if digits else float("inf")
+
+    rows.sort(key=lambda r: (STATUTS.index(r["statut"]), r["appareil"], num(r["capteur"]), r["capteur"]))
+    return rows
@@ -0,0 +1,137 @@
+"""
+Détection des trous et des capteurs muets dans le flux de relevés.
+
+Le planificateur indique à chaque relevé quand le suivant est attendu ; à partir
+de là, GapDetector compte au fil de l'eau (sans relire les CSV) :
+  - les relevés planifiés qui n'ont pas eu lieu (collecteur arrêté, boucle bloquée)
+  - les relevés échoués (appareil injoignable)
+  - les capteurs absents de la page
+et tient, par jour, le nombre de relevés attendus / reçus par capteur, pour les
+taux de complétude des rapports. État dans data/completude.json.
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+GAPS_PATH = os.path.join("data", "completude.json")
+# Relevés manqués d'affilée avant de déclarer un capteur / appareil muet
+STALE_AFTER_MISSED = int(os.getenv("MINILIDE_STALE_AFTER_MISSED", "3"))
+# Retard toléré sur un relevé planifié, en fraction de l'intervalle attendu
+GAP_GRACE = float(os.getenv("MINILIDE_GAP_GRACE", "0.5"))
+KEEP_DAYS = 400
+DEVICE_KEY = "*"
+
+
+def _libelle(appareil: str) -> str:
+    return f"Minilide {appareil}" if appareil else "Minilide"
+
+
+class GapDetector:
+    def __init__(self, path: str = GAPS_PATH, stale_after_missed: int = STALE_AFTER_MISSED):
+        self.path = path
+        self.stale_after_missed = max(1, stale_after_missed)
+        self.state = {"appareils": {}, "jours": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.state.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+
+    def _count(self, day: str, appareil: str, capteur: str, expected: int, received: int):
+        counts = self.state["jours"].setdefault(day, {}).setdefault(appareil, {})
+        exp, rec = counts.get(capteur, (0, 0))
+        counts[capteur] = [exp + expected, rec + received]
+
+    def record_poll(self, appareil: str, releves, now: datetime,
+                    next_expected: Optional[datetime]) -> List[str]:
+        """
+        Enregistre un relevé (liste vide = échec) et l'heure du suivant attendu.
+        Retourne les événements à signaler (trous, capteurs muets, retours).
+        """
+        events = []
+        lib = _libelle(appareil)
+        dev = self.state["appareils"].setdefault(
+            appareil, {"prochain": None, "intervalle": 0, "echecs": 0, "capteurs": {}})
+        day = now.date().isoformat()
+
+        # Relevés planifiés qui n'ont jamais eu lieu depuis le précédent.
+        missed_slots = 0
+        if dev["prochain"] and dev["intervalle"] > 0:
+            prev_next = datetime.fromisoformat(dev["prochain"])
+            late = (now - prev_next).total_seconds()
+            if late > GAP_GRACE * dev["intervalle"]:
+                missed_slots = max(1, round(late / dev["intervalle"]))
+                events.append(f"{lib} : {missed_slots} relevé(s) planifié(s) manqué(s) "
+                              f"depuis {prev_next:%d/%m %H:%M}")
+
+        self._count(day, appareil, DEVICE_KEY, 1 + missed_slots, 1 if releves else 0)
+        if releves:
+            if dev["echecs"] >= self.stale_after_missed:
+                events.append(f"{lib} : de nouveau joignable")
+            dev["echecs"] = 0
+        else:
+            dev["echecs"] += 1
+            if dev["echecs"] == self.stale_after_missed:
+                events.append(f"{lib} : injoignable ({dev['echecs']} relevés échoués d'affilée)")
+
+        received = {r.capteur for r in releves}
+        for capteur in sorted(set(dev["capteurs"]) | received):
+            c = dev["capteurs"].setdefault(capteur, {"vu": None, "manques": 0, "muet": False})
+            self._count(day, appareil, capteur, 1 + missed_slots, 1 if capteur in received else 0)
+            if capteur in received:
+                if c["muet"]:
+                    events.append(f"{lib} {capteur} : de nouveau reçu")
+                c.update(vu=now.isoformat(timespec="seconds"), manques=0, muet=False)
+                continue
+            c["manques"] += 1 + missed_slots
+            # Appareil injoignable : un seul événement pour l'appareil, pas un par capteur.
+            if releves and not c["muet"] and c["manques"] >= self.stale_after_missed:
+                c["muet"] = True
+                depuis = c["vu"] or "jamais reçu"
+                events.append(f"{lib} {capteur} : absent de la page depuis {depuis} "
+                              f"({c['manques']} relevés manqués)")
+
+        if next_expected is not None:
+            dev["prochain"] = next_expected.isoformat(timespec="seconds")
+            dev["intervalle"] = max(0.0, (next_expected - now).total_seconds())
+        return events
+
+    def stale_sensors(self, appareil: Optional[str] = None) -> List[Tuple[str, str]]:
+        return [(app, cap)
+                for app, dev in self.state["appareils"].items()
+                if appareil is None or app == appareil
+                for cap, c in dev["capteurs"].items() if c["muet"]]
+
+    def unreachable_devices(self) -> List[str]:
+        return [app for app, dev in self.state["appareils"].items()
+                if dev["echecs"] >= self.stale_after_missed]
+
+    def save(self):
+        cutoff = date.fromordinal(date.today().toordinal() - KEEP_DAYS).isoformat()
+        for day in [d for d in self.state["jours"] if d < cutoff]:
+            del self.state["jours"][day]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def completeness(year: int, month: int, appareil: str = "",
+                 path: str = GAPS_PATH) -> Dict[str, Tuple[int, int]]:
+    """{capteur: (reçus, attendus)} sur un mois ; la clé "*" compte les relevés de l'appareil."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        jours = json.load(f).get("jours", {})
+    prefix = f"{year:04d}-{month:02d}-"
+    totals: Dict[str, Tuple[int, int]] = {}
+    for day, appareils in jours.items():
+        if not day.startswith(prefix):
+            continue
+        for capteur, (exp, rec) in appareils.get(appareil, {}).items():
+            r, e = totals.get(capteur, (0, 0))
+            totals[capteur] = (r + rec, e + exp)
+    return totals
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Import en masse d'historiques de températures (CSV / Excel) dans les partitions
+mensuelles data/temperatures_MM-YYYY.csv.
+
+  python import_minilide.py export_2021.csv export_2022.xlsx [--appareil labo]
+
+Deux phases, pour ne jamais charger tout l'historique en mémoire :
+  1. lecture des fichiers par blocs, normalisation des colonnes (mêmes alias que
+     read_csv_safe) et répartition des lignes dans des fichiers tampons par mois ;
+  2. fusion de chaque mois dans sa partition, en parallèle (un processus par mois),
+     avec dédoublonnage (timestamp, capteur) contre les relevés déjà présents.
+
+La fusion réécrit les partitions : elle se fait sous le verrou du journal. Si un
+collecteur tourne (verrou pris), seuls les mois clos sont fusionnés ; le mois
+courant, où le collecteur écrit, est laissé pour un import collecteur arrêté.
+Chaque partition est de plus verrouillée pendant sa fusion, contre l'archivage.
+"""
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Iterator
+
+import pandas as pd
+
+from journal_minilide import JournalLocked, acquire_lock, acquire_partition_lock, release_lock
+from stockage_minilide import (
+    COLUMNS,
+    appareil_dir,
+    month_csv_path,
+    normalize_columns,
+    read_csv_safe,
+)
+
+CHUNK_ROWS = 200_000
+
+
+def _sniff_sep(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace", newline="") as f:
+        sample = f.read(64 * 1024)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t|").delimiter
+    except csv.Error:
+        return ","
+
+def _iter_excel(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    if path.lower().endswith(".xls"):
+        # Ancien format : pas de lecture en flux possible.
+        yield pd.read_excel(path)
+        return
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise SystemExit("[ERREUR] openpyxl est requis pour importer des fichiers Excel (pip install openpyxl).")
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            rows = ws.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            header = [str(h) if h is not None else f"col{i}" for i, h in enumerate(header)]
+            buf = []
+            for row in rows:
+                buf.append(row)
+                if len(buf) >= chunk_rows:
+                    yield pd.DataFrame(buf, columns=header)
+                    buf = []
+            if buf:
+                yield pd.DataFrame(buf, columns=header)
+    finally:
+        wb.close()
+
+def iter_chunks(path: str, chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Blocs normalisés (timestamp / capteur / temperature) d'un export CSV ou Excel."""
+    if path.lower().endswith((".xlsx", ".xlsm", ".xls")):
+        raw_chunks = _iter_excel(path, chunk_rows)
+    else:
+        raw_chunks = pd.read_csv(path, sep=_sniff_sep(path), chunksize=chunk_rows,
+                                 encoding_errors="replace")
+
+    for df in raw_chunks:
+        df = normalize_columns(df)
+        missing = set(COLUMNS) - set(df.columns)
+        if missing:
+            raise SystemExit(f"[ERREUR] {path} : colonnes manquantes {missing}")
+        # Exports français : virgule décimale ("20,5"), comme dans les pages du Minilide.
+        temperature = df["temperature"].astype(str).str.strip().str.replace(",", ".", regex=False)
+        df = df.assign(
+            timestamp=pd.to_datetime(df["timestamp"], errors="coerce"),
+            capteur=df["capteur"].astype(str).str.strip(),
+            temperature=pd.to_numeric(temperature, errors="coerce"),
+        )
+        valid = df.dropna(subset=["timestamp", "temperature"])
+        rejected = len(df) - len(valid)
+        if rejected:
+            print(f"[WARN] {path} : {rejected} ligne(s) rejetée(s) (horodatage ou température illisible)")
+        yield valid
+
+def spool_by_month(paths, spool_dir: str, chunk_rows: int = CHUNK_ROWS) -> dict:
+    """Phase 1 : répartit les lignes dans spool_dir/MM-YYYY.csv. Retourne {MM-YYYY: nb lignes}."""
+    counts = {}
+    for path in paths:
+        print(f"[INFO] Lecture de {path}")
+        for df in iter_chunks(path, chunk_rows):
+            for period, part in df.groupby(df["timestamp"].dt.to_period("M")):
+                key = period.strftime("%m-%Y")
+                spool = os.path.join(spool_dir, f"{key}.csv")
+                part.to_csv(spool, mode="a", header=key not in counts, index=False)
+                counts[key] = counts.get(key, 0) + len(part)
+    return counts
+
+def merge_month(spool_path: str, dest_path: str) -> int:
+    """
+    Phase 2 : fusionne un fichier tampon dans sa partition mensuelle.
+    Les lignes déjà présentes (même timestamp et capteur) sont ignorées ;
+    la partition est réécrite triée, de façon atomique, sous son verrou
+    (partagé avec l'archivage, qui peut la supprimer).
+    """
+    new = pd.read_csv(spool_path, parse_dates=["timestamp"], dtype={"capteur": str})
+    new = new.drop_duplicates(subset=["timestamp", "capteur"])
+
+    lock = acquire_partition_lock(dest_path)
+    try:
+        return _merge_into(new, dest_path)
+    finally:
+        release_lock(lock)
+
+def _merge_into(new: pd.DataFrame, dest_path: str) -> int:
+    existing = read_csv_safe(dest_path)
+    if not existing.empty:
+        existing = existing.assign(capteur=existing["capteur"].astype(str))
+        known = pd.MultiIndex.from_frame(existing[["timestamp", "capteur"]])
+        mask = pd.MultiIndex.from_frame(new[["timestamp", "capteur"]]).isin(known)
+        new = new[~mask]
+
+    if new.empty:
+        return 0
+
+    if existing.empty:
+        merged = new[COLUMNS]
+    else:
+        merged = pd.concat([existing, new[COLUMNS]], ignore_index=True)
+    merged = merged.sort_values("timestamp", kind="stable")
+
+    tmp_path = dest_path + ".tmp"
+    merged.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, dest_path)
+    return len(new)
+
+def import_files(paths, appareil: str = "", workers: int = None, chunk_rows: int = CHUNK_ROWS) -> int:
+    spool_dir = tempfile.mkdtemp(prefix="minilide_import_")
+    total = 0
+    lock = None
+    try:
+        counts = spool_by_month(paths, spool_dir, chunk_rows)
+        if not counts:
+            print("[INFO] Aucune ligne exploitable.")
+            return 0
+
+        current_key = datetime.now().strftime("%m-%Y")
+        try:
+            lock = acquire_lock()
+        except JournalLocked as e:
+            if current_key in counts:
+                print(f"[WARN] {e}")
+                print(f"[WARN] Mois courant {current_key} non importé ({counts.pop(current_key)} lignes) : "
+                      f"arrêter le collecteur puis relancer l'import.")
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for key in counts:
+                dest = month_csv_path(datetime.strptime(key, "%m-%Y"), appareil)
+                spool = os.path.join(spool_dir, f"{key}.csv")
+                futures[pool.submit(merge_month, spool, dest)] = dest
+            for fut in as_completed(futures):
+                added = fut.result()
+                total += added
+                print(f"[OK] {futures[fut]} : +{added} lignes")
+
+        # Le miroir suit le mois courant : on le rafraîchit s'il a été complété.
+        current = month_csv_path(datetime.now(), appareil)
+        if current_key in counts and os.path.exists(current):
+            shutil.copyfile(current, os.path.join(appareil_dir(appareil), "temperatures.csv"))
+    finally:
+        if lock is not None:
+            release_lock(lock)
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description="Import d'historiques de températures Minilide.")
+    parser.add_argument("fichiers", nargs="+", help="exports CSV ou Excel à importer")
+    parser.add_argument("--appareil", default="", help="appareil cible (défaut : appareil historique)")
+    parser.add_argument("--workers", type=int, default=None, help="processus de fusion (défaut : nb de cœurs)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="lignes lues par bloc")
+    args = parser.parse_args()
+
+    total = import_files(args.fichiers, args.appareil, args.workers, args.chunk_rows)
+    print(f"[OK] Import terminé : {total} nouvelles lignes.")
+
+if __name__ == "__main__":
+    main()
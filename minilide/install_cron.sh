@@ -5,10 +5,13 @@ PYTHON_PATH="/usr/bin/python3"
 
 EXTRACT_SCRIPT="$PYTHON_PATH $PROJECT_DIR/extract_minilide.py"
 SEND_SCRIPT="$PYTHON_PATH $PROJECT_DIR/send_report.py"
+# Sans --appareil : compacte tous les appareils (data/ et data/<nom>/)
+ARCHIVE_SCRIPT="cd $PROJECT_DIR && $PYTHON_PATH archive_minilide.py"
 
 CRON_ENTRIES="
 */15 * * * * $EXTRACT_SCRIPT
 0 18 * * * $SEND_SCRIPT
+30 3 1 * * $ARCHIVE_SCRIPT
 "
 
 crontab -l > old_crontab.bak 2>/dev/null
@@ -2,11 +2,17 @@ from nicegui import ui
 import pandas as pd
 import os
 from datetime import datetime
+import math
 import re
-from typing import Optional
+from typing import List, Optional
+
+from anomalies_minilide import load_scores
+from flotte_minilide import FLEET_DAYS, FLEET_PATH, FLEET_SPARK_HOURS, STATUTS, fleet_rows, load_noms
+from profiling_minilide import profiled
+from ring_minilide import RingReader
 
 csv_path = 'data/temperatures.csv'
-selected_date = None
+FLEET_PAGE_SIZE = int(os.getenv("MINILIDE_FLEET_PAGE_SIZE", "50"))
 
 CAPTEUR_NOMS = {
     'Capteur 1': 'LABO Ambiant',
@@ -27,6 +33,31 @@ CAPTEUR_NOMS = {
     'Capteur 16': 'TEMP16 vide',
 }
 
+STATUT_COULEURS = {'hors plage': 'negative', 'muet': 'grey', 'anomalie': 'warning', 'ok': 'positive'}
+
+FLEET_COLUMNS = [
+    {'name': 'appareil', 'label': 'Appareil', 'field': 'appareil', 'align': 'left'},
+    {'name': 'capteur', 'label': 'Capteur', 'field': 'capteur', 'align': 'left'},
+    {'name': 'temp', 'label': 'Dernier relevé', 'field': 'temp'},
+    {'name': 'releve', 'label': 'Heure', 'field': 'releve'},
+    {'name': 'statut', 'label': 'Statut', 'field': 'statut'},
+    {'name': 'excursions', 'label': f'Excursions ({FLEET_DAYS} j)', 'field': 'excursions'},
+    {'name': 'tendance', 'label': f'Tendance ({FLEET_SPARK_HOURS} h)', 'field': 'tendance'},
+]
+
+_fleet_cache = {'mtime': None, 'rows': []}
+
+
+class VueJour:
+    """Éléments de la page du jour, un par navigateur."""
+    def __init__(self):
+        self.selected_date = None
+        self.last_render = None  # (date, séquence de l'anneau) du dernier affichage
+        self.latest_row = None
+        self.table_column = None
+        self.chart = None
+
+
 def set_chart_options(chart, options: dict) -> None:
     chart.options.clear()
     chart.options.update(options)
@@ -51,10 +82,61 @@ def load_data() -> pd.DataFrame:
     df = df.dropna(subset=["timestamp"])
     return df
 
-def update_chart(date_str: Optional[str] = None) -> None:
-    global selected_date
+def load_ring_day(reader: Optional[RingReader], day) -> Optional[pd.DataFrame]:
+    """Relevés du jour depuis l'anneau partagé, ou None s'il ne couvre pas toute la journée."""
+    if reader is None or day != datetime.now().date():
+        return None
+    since = datetime.combine(day, datetime.min.time())
+    if not reader.covers(since, appareil=""):
+        return None
+    rows = [(ts, cap, temp)
+            for _, cap, points in reader.history_by_sensor(appareil="", since=since)
+            for ts, temp in points]
+    return pd.DataFrame(rows, columns=["timestamp", "capteur", "temperature"])
+
+def update_latest(vue: VueJour, reader: Optional[RingReader]) -> None:
+    latest_row = vue.latest_row
+    latest_row.clear()
+    if reader is None:
+        return
+    def num(capteur):
+        m = re.search(r'\d+', capteur)
+        return int(m.group()) if m else float('inf')
+
+    latest = sorted(reader.latest(appareil=""), key=lambda x: num(x[1]))
+    scores = load_scores(appareil="")
+    with latest_row:
+        for _, cap, ts, temp in latest:
+            score = scores.get(cap, {})
+            badge = ui.badge(f"{CAPTEUR_NOMS.get(cap, cap)} : {temp:.1f}°C ({ts:%H:%M})",
+                             color='negative' if score.get("anomalie") else 'primary').props('outline')
+            if score:
+                badge.tooltip(f"Écart {score['z']:+.1f} σ, dérive {score['derive']:+.1f} σ")
 
-    df = load_data()
+@profiled()
+def update_chart(vue: VueJour, date_str: Optional[str] = None, force: bool = True) -> None:
+    if date_str:
+        vue.selected_date = pd.to_datetime(date_str).date()
+    elif not vue.selected_date:
+        vue.selected_date = datetime.now().date()
+    selected_date = vue.selected_date
+    chart, table_column = vue.chart, vue.table_column
+
+    reader = RingReader.open()
+    try:
+        # Rafraîchissement périodique : rien de nouveau dans l'anneau, rien à redessiner.
+        render_key = (selected_date, reader.sequence) if reader else None
+        if not force and render_key is not None and render_key == vue.last_render:
+            return
+        vue.last_render = render_key
+
+        update_latest(vue, reader)
+        df = load_ring_day(reader, selected_date)
+    finally:
+        if reader:
+            reader.close()
+    if df is None:
+        df = load_data()
     if df.empty:
         print("CSV vide.")
         set_chart_options(chart, {
@@ -69,11 +151,6 @@ def update_chart(date_str: Optional[str] = None) -> None:
         table_column.clear()
         return
 
-    if date_str:
-        selected_date = pd.to_datetime(date_str).date()
-    elif not selected_date:
-        selected_date = datetime.now().date()
-
     df_filtered = df[df["timestamp"].dt.date == selected_date]
     print(f"Date sélectionnée : {selected_date} — lignes: {len(df_filtered)}")
 
@@ -137,28 +214,136 @@ def update_chart(date_str: Optional[str] = None) -> None:
             rows=display_df.to_dict(orient="records")
         ).classes("w-full").style('overflow-x: auto; max-height: 300px;')
 
-with ui.row():
-    default_date = str(datetime.now().date())
-    date_picker = ui.date(
-        default_date,
-        on_change=lambda e: update_chart(e.value)
-    ).props(f'max={default_date}')
-
-table_column = ui.column()
-
-chart = ui.echart({
-    'title': {'text': 'Températures par capteur', 'left': 'center', 'top': 5},
-    'tooltip': {'trigger': 'axis'},
-    'legend': {'data': [], 'top': 10, 'type': 'scroll', 'orient': 'horizontal'},
-    'grid': {'top': 90, 'bottom': 60, 'left': 60, 'right': 30, 'containLabel': True},
-    'xAxis': {'type': 'category', 'data': []},
-    'yAxis': {'type': 'value'},
-    'series': [],
-}).classes("w-full").style('height: 520px; margin-top: 8px;')
-
-selected_date = datetime.now().date()
-update_chart(str(selected_date))
-
-ui.timer(30.0, lambda: update_chart(str(selected_date)))
+def sparkline_svg(points: List[Optional[float]], width: int = 120, height: int = 24) -> str:
+    """Petite courbe SVG (calculée côté serveur : quelques centaines d'octets par capteur)."""
+    values = [v for v in points if v is not None]
+    if len(values) < 2:
+        return ''
+    lo, hi = min(values), max(values)
+    span = (hi - lo) or 1.0
+    step = width / max(len(points) - 1, 1)
+    coords = " ".join(f"{i * step:.0f},{height - 2 - (v - lo) / span * (height - 4):.0f}"
+                      for i, v in enumerate(points) if v is not None)
+    return (f'<svg width="{width}" height="{height}"><polyline points="{coords}" '
+            f'fill="none" stroke="currentColor" stroke-width="1.5"/></svg>')
+
+def load_fleet() -> List[dict]:
+    """
+    Lignes du parc prêtes à afficher. Recalculées seulement quand data/flotte.json
+    change, et partagées par tous les navigateurs.
+    """
+    mtime = os.path.getmtime(FLEET_PATH) if os.path.exists(FLEET_PATH) else None
+    if mtime != _fleet_cache['mtime']:
+        noms = load_noms()
+        rows = []
+        for i, r in enumerate(fleet_rows()):
+            app, cap = r['appareil'], r['capteur']
+            nom = noms.get(app, {}).get(cap) or (CAPTEUR_NOMS.get(cap) if not app else None) or cap
+            ts = datetime.fromisoformat(r['ts']) if r['ts'] else None
+            rows.append({
+                'id': i,
+                'appareil': app or 'Minilide',
+                'capteur': nom,
+                'temp': f"{r['temp']:.1f}°C" if r['temp'] is not None else '',
+                'releve': f"{ts:%d/%m %H:%M}" if ts else '',
+                'statut': r['statut'],
+                'couleur': STATUT_COULEURS[r['statut']],
+                'excursions': r['excursions'],
+                'tendance': sparkline_svg(r['tendance']),
+                'recherche': f"{app} {cap} {nom}".lower(),
+            })
+        _fleet_cache.update(mtime=mtime, rows=rows)
+    return _fleet_cache['rows']
+
+@ui.page('/')
+def index():
+    vue = VueJour()
+    with ui.row():
+        default_date = str(datetime.now().date())
+        date_picker = ui.date(
+            default_date,
+            on_change=lambda e: update_chart(vue, e.value)
+        ).props(f'max={default_date}')
+        ui.link("Vue d'ensemble du parc", '/parc')
+
+    vue.latest_row = ui.row().classes("w-full")
+    vue.table_column = ui.column()
+
+    vue.chart = ui.echart({
+        'title': {'text': 'Températures par capteur', 'left': 'center', 'top': 5},
+        'tooltip': {'trigger': 'axis'},
+        'legend': {'data': [], 'top': 10, 'type': 'scroll', 'orient': 'horizontal'},
+        'grid': {'top': 90, 'bottom': 60, 'left': 60, 'right': 30, 'containLabel': True},
+        'xAxis': {'type': 'category', 'data': []},
+        'yAxis': {'type': 'value'},
+        'series': [],
+    }).classes("w-full").style('height: 520px; margin-top: 8px;')
+
+    vue.selected_date = datetime.now().date()
+    update_chart(vue, str(vue.selected_date))
+
+    ui.timer(30.0, lambda: update_chart(vue, str(vue.selected_date), force=False))
+
+@ui.page('/parc')
+def parc():
+    """Vue d'ensemble : tous les capteurs de tous les appareils, par pages de FLEET_PAGE_SIZE."""
+    state = {'page': 1, 'rendered': None}
+
+    with ui.row().classes("items-center w-full"):
+        ui.link("Relevés du jour", '/')
+        resume_row = ui.row().classes("items-center")
+    with ui.row().classes("items-center"):
+        filtre = ui.select({'tous': 'Tous les capteurs', 'alertes': 'À surveiller'},
+                           value='tous', on_change=lambda: show(page=1))
+        recherche = ui.input('Appareil ou capteur', on_change=lambda: show(page=1)).props('clearable debounce=300')
+
+    table = ui.table(columns=FLEET_COLUMNS, rows=[], row_key='id').classes("w-full")
+    table.add_slot('body-cell-statut',
+                   '<q-td :props="props"><q-badge :color="props.row.couleur" :label="props.value" /></q-td>')
+    table.add_slot('body-cell-tendance',
+                   '<q-td :props="props"><span v-html="props.value"></span></q-td>')
+
+    def change_page(e):
+        if e.value and e.value != state['page']:
+            show(page=e.value)
+
+    pagination = ui.pagination(1, 1, direction_links=True, on_change=change_page)
+
+    def show(page: Optional[int] = None):
+        rows = load_fleet()
+        if page:
+            state['page'] = page
+        # Seule la page affichée est envoyée au navigateur, et seulement si elle a changé.
+        key = (_fleet_cache['mtime'], filtre.value, recherche.value, state['page'])
+        if key == state['rendered']:
+            return
+        state['rendered'] = key
+
+        resume_row.clear()
+        with resume_row:
+            appareils = {r['appareil'] for r in rows}
+            ui.label(f"{len(appareils)} appareil(s), {len(rows)} capteur(s)")
+            for s in STATUTS:
+                n = sum(1 for r in rows if r['statut'] == s)
+                if n:
+                    ui.badge(f"{s} : {n}", color=STATUT_COULEURS[s])
+
+        if filtre.value == 'alertes':
+            rows = [r for r in rows if r['statut'] != 'ok']
+        query = (recherche.value or '').strip().lower()
+        if query:
+            rows = [r for r in rows if query in r['recherche']]
+
+        pages = max(1, math.ceil(len(rows) / FLEET_PAGE_SIZE))
+        state['page'] = min(state['page'], pages)
+        start = (state['page'] - 1) * FLEET_PAGE_SIZE
+        table.rows = rows[start:start + FLEET_PAGE_SIZE]
+        table.update()
+        pagination.max = pages
+        pagination.value = state['page']
+        pagination.update()
+
+    show()
+    ui.timer(30.0, show)
 
 ui.run(host="0.0.0.0", port=80)
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+Tampon d'écriture journalisé (write-ahead) pour les partitions mensuelles.
+
+Chaque relevé est d'abord ajouté à un petit journal en ajout seul, puis gardé en
+mémoire ; les relevés sont écrits dans leurs temperatures_MM-YYYY.csv par groupes
+(commit), quand le tampon atteint commit_rows lignes ou commit_seconds secondes.
+
+Avant d'écrire un groupe, la taille de chaque partition visée est notée dans le
+journal : après un arrêt brutal, replay() ramène les partitions à cette taille
+(plus de ligne tronquée) puis réécrit les relevés du journal.
+
+Un seul collecteur à la fois (monitoring H24 ou relevé ponctuel) : le tampon prend
+un verrou exclusif du système (data/journal.wal.lock) pour toute sa durée de vie.
+Il protège aussi les autres fichiers d'état partagés (anneau, complétude,
+anomalies, synthèse du parc), que seul le détenteur du verrou modifie.
+
+Politique fsync :
+  - "always" : journal synchronisé à chaque relevé, partitions à chaque commit
+  - "commit" : journal et partitions synchronisés à chaque commit (défaut)
+  - "never"  : on laisse le système gérer les écritures disque
+"""
+import csv
+import io
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+from collecteur_minilide import Releve
+from stockage_minilide import COLUMNS, month_csv_path
+
+JOURNAL_PATH = os.path.join("data", "journal.wal")
+COMMIT_ROWS = int(os.getenv("MINILIDE_COMMIT_ROWS", "256"))
+COMMIT_SECONDS = float(os.getenv("MINILIDE_COMMIT_SECONDS", "60"))
+FSYNC_POLICY = os.getenv("MINILIDE_FSYNC", "commit")
+
+FSYNC_POLICIES = ("always", "commit", "never")
+# Attente du verrou d'une partition mensuelle (import / archivage)
+PARTITION_LOCK_WAIT = 300.0
+
+
+class JournalLocked(RuntimeError):
+    """Le journal est déjà utilisé par un autre collecteur."""
+
+
+class PartitionLocked(RuntimeError):
+    """Une partition mensuelle est en cours de réécriture (import ou archivage)."""
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+def _drop_partial_line(path: str):
+    """Supprime une éventuelle dernière ligne incomplète (sans fin de ligne)."""
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Remonte jusqu'au dernier saut de ligne.
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            nl = chunk.rfind(b"\n")
+            if nl != -1:
+                f.truncate(pos + nl + 1)
+                return
+        f.truncate(0)
+
+def _try_lock(f) -> bool:
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+def _lock_file(path: str, wait_seconds: float):
+    """Ouvre et verrouille path ; None si le verrou est encore pris au bout de wait_seconds."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    f = open(path, "a+b")
+    deadline = time.monotonic() + wait_seconds
+    while not _try_lock(f):
+        if time.monotonic() >= deadline:
+            f.close()
+            return None
+        time.sleep(0.2)
+    return f
+
+def acquire_lock(journal_path: str = JOURNAL_PATH, wait_seconds: float = 0.0):
+    """
+    Verrou exclusif des écrivains de data/ (libéré à la fin du processus au plus tard).
+    Retourne le fichier verrou, à passer à release_lock ; lève JournalLocked
+    si le verrou est encore pris au bout de wait_seconds.
+    """
+    path = journal_path + ".lock"
+    f = _lock_file(path, wait_seconds)
+    if f is None:
+        raise JournalLocked(f"{path} est verrouillé : un autre collecteur "
+                            f"(monitoring_minilide.py, extract_minilide.py ou un import) est en cours.")
+    return f
+
+def acquire_partition_lock(partition_path: str, wait_seconds: float = PARTITION_LOCK_WAIT):
+    """
+    Verrou d'une partition mensuelle (<partition>.lock), pris par l'import
+    (merge_month) et l'archivage (archive_month) autour de leur lecture /
+    réécriture ou suppression. Indépendant du verrou du journal : le monitoring
+    H24 ne bloque pas l'archivage des mois clos. Le fichier verrou n'est jamais
+    supprimé (un autre processus peut attendre dessus). Lève PartitionLocked.
+    """
+    path = partition_path + ".lock"
+    f = _lock_file(path, wait_seconds)
+    if f is None:
+        raise PartitionLocked(f"{partition_path} est en cours d'import ou d'archivage.")
+    return f
+
+def release_lock(f):
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
+    f.close()
+
+
+class WriteAheadBuffer:
+    def __init__(self,
+                 journal_path: str = JOURNAL_PATH,
+                 commit_rows: int = COMMIT_ROWS,
+                 commit_seconds: float = COMMIT_SECONDS,
+                 fsync: str = FSYNC_POLICY,
+                 on_commit: Optional[Callable[[Dict[str, int]], None]] = None,
+                 lock_wait: float = 0.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Politique fsync inconnue : {fsync} (attendu : {', '.join(FSYNC_POLICIES)})")
+        self._lock = acquire_lock(journal_path, lock_wait)
+        self.journal_path = journal_path
+        self.commit_rows = max(1, commit_rows)
+        self.commit_seconds = commit_seconds
+        self.fsync = fsync
+        self.on_commit = on_commit
+        self._pending: List[Releve] = []
+        self._first_pending_at: Optional[float] = None
+
+        os.makedirs(os.path.dirname(journal_path) or ".", exist_ok=True)
+        self._journal = open(journal_path, "a+", encoding="utf-8", newline="")
+
+    # --- Journal -----------------------------------------------------------
+
+    def _journal_write(self, lines: Iterable[str], sync: bool):
+        self._journal.write("".join(lines))
+        if sync:
+            _fsync(self._journal)
+        else:
+            self._journal.flush()
+
+    @staticmethod
+    def _encode(r: Releve) -> str:
+        buf = io.StringIO()
+        csv.writer(buf, lineterminator="\n").writerow(
+            ["R", r.appareil, r.timestamp.isoformat(sep=" "), r.capteur, repr(float(r.temperature))])
+        return buf.getvalue()
+
+    def replay(self) -> int:
+        """
+        À appeler au démarrage : annule un commit interrompu et réécrit les
+        relevés restés dans le journal. Retourne le nombre de relevés rejoués.
+        """
+        self._journal.seek(0)
+        content = self._journal.read()
+        releves = []
+        sizes = {}
+        for line in content.splitlines(keepends=True):
+            if not line.endswith("\n"):
+                break  # dernière ligne incomplète : relevé jamais confirmé
+            try:
+                row = next(csv.reader([line]))
+                if row[0] == "R":
+                    releves.append(Releve(row[1], datetime.fromisoformat(row[2]), row[3], float(row[4])))
+                elif row[0] == "C":
+                    sizes.setdefault(row[1], int(row[2]))
+            except (StopIteration, IndexError, ValueError):
+                continue
+
+        for path, size in sizes.items():
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "rb+") as f:
+                    f.truncate(size)
+
+        self._reset_journal()
+        if releves:
+            self._pending = []
+            self._first_pending_at = None
+            self.append(releves, journal=True)
+            self.commit()
+        return len(releves)
+
+    def _reset_journal(self):
+        self._journal.seek(0)
+        self._journal.truncate(0)
+        if self.fsync != "never":
+            _fsync(self._journal)
+
+    # --- API ---------------------------------------------------------------
+
+    def append(self, releves: Iterable[Releve], journal: bool = True):
+        releves = list(releves)
+        if not releves:
+            return
+        if journal:
+            self._journal_write((self._encode(r) for r in releves), sync=self.fsync == "always")
+        if self._first_pending_at is None:
+            self._first_pending_at = time.monotonic()
+        self._pending.extend(releves)
+        if len(self._pending) >= self.commit_rows:
+            self.commit()
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Délai avant le prochain commit par le temps (None si rien en attente)."""
+        if self._first_pending_at is None:
+            return None
+        return max(0.0, self._first_pending_at + self.commit_seconds - time.monotonic())
+
+    def maybe_commit(self) -> bool:
+        due = self.seconds_until_due()
+        if due is not None and due <= 0:
+            self.commit()
+            return True
+        return False
+
+    def commit(self) -> Dict[str, int]:
+        """Écrit les relevés en attente dans leurs partitions. Retourne {chemin: lignes}."""
+        if not self._pending:
+            return {}
+
+        groups: Dict[str, List[Releve]] = {}
+        for r in self._pending:
+            groups.setdefault(month_csv_path(r.timestamp, r.appareil), []).append(r)
+
+        # Tailles avant écriture : point de reprise si le commit est interrompu.
+        marks = []
+        for path in groups:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                _drop_partial_line(path)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            buf = io.StringIO()
+            csv.writer(buf, lineterminator="\n").writerow(["C", path, size])
+            marks.append(buf.getvalue())
+        self._journal_write(marks, sync=self.fsync != "never")
+
+        written = {}
+        for path, rows in groups.items():
+            empty = not os.path.exists(path) or os.path.getsize(path) == 0
+            buf = io.StringIO()
+            w = csv.writer(buf, lineterminator="\n")
+            if empty:
+                w.writerow(COLUMNS)
+            w.writerows((r.timestamp.isoformat(sep=" "), r.capteur, r.temperature) for r in rows)
+            with open(path, "a", encoding="utf-8", newline="") as f:
+                f.write(buf.getvalue())
+                if self.fsync != "never":
+                    _fsync(f)
+            written[path] = len(rows)
+
+        self._pending = []
+        self._first_pending_at = None
+        self._reset_journal()
+
+        if self.on_commit:
+            self.on_commit(written)
+        return written
+
+    def close(self):
+        try:
+            self.commit()
+            self._journal.close()
+        finally:
+            release_lock(self._lock)
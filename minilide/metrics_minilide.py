@@ -0,0 +1,44 @@
+"""
+Métriques du monitoring, exposées dans log/metrics.json (réécrit à chaque flush).
+
+  metrics.set("poll_interval_seconds", 60, appareil="labo")
+  metrics.inc("polls_total", appareil="labo", raison="proche_limite")
+  metrics.flush()
+"""
+import json
+import os
+from datetime import datetime
+
+METRICS_PATH = os.path.join("log", "metrics.json")
+
+
+def _label_key(labels: dict) -> str:
+    return ",".join(f"{k}={v}" for k, v in sorted(labels.items()))
+
+
+class Metrics:
+    def __init__(self, path: str = METRICS_PATH):
+        self.path = path
+        self._values = {}
+
+    def set(self, name: str, value, **labels):
+        self._values.setdefault(name, {})[_label_key(labels)] = value
+
+    def inc(self, name: str, n=1, **labels):
+        series = self._values.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + n
+
+    def get(self, name: str, **labels):
+        return self._values.get(name, {}).get(_label_key(labels))
+
+    def flush(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"updated_at": datetime.now().isoformat(timespec="seconds"),
+                       "metrics": self._values}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+metrics = Metrics()
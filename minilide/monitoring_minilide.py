@@ -1,122 +1,36 @@
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime, timedelta
 import os
-from pushbullet import Pushbullet
 from dotenv import load_dotenv
-import re
 import time as t
 
-load_dotenv()
-
-def extract_name_temp_from_html(html: str):
-    soup = BeautifulSoup(html, 'html.parser')
-    pairs = []
-    temp_nodes = soup.find_all(string=re.compile(r"[-+]?\d{1,3}[.,]?\d*\s*°\s*C", re.I))
-    for tnode in temp_nodes:
-        try:
-            temp = float(re.sub(r"[^\d\-,.]", "", tnode).replace(",", "."))
-        except Exception:
-            continue
+# Avant les modules du projet : ils lisent leur configuration MINILIDE_* à l'import.
+# Pas dans les processus d'analyse (__mp_main__) : ils héritent de l'environnement.
+if __name__ == "__main__":
+    load_dotenv()
+
+from alertes_minilide import out_of_range_messages, reference_range
+from alertes_minilide import send_alert as push_alert
+from anomalies_minilide import AnomalyDetector
+from collecteur_minilide import collect, load_appareils, load_min_intervals
+from flotte_minilide import FleetSummary
+from gaps_minilide import GapDetector
+from journal_minilide import JournalLocked, WriteAheadBuffer
+from metrics_minilide import metrics
+from polling_minilide import POLL_ADAPTIVE, AdaptivePolicy
+from profiling_minilide import profiled
+from ring_minilide import RingWriter
+from stockage_minilide import refresh_mirror
 
-        name = None
-
-        card = tnode.find_parent(["div","td","span","li","section","article"])
-        if card:
-            title = (card.find(["h1","h2","h3","h4","h5","h6"]) or
-                     card.find(["strong","b"]))
-            if title and title.get_text(strip=True):
-                name = title.get_text(" ", strip=True)
-
-            if not name:
-                texts = [x.strip() for x in card.stripped_strings]
-                if len(texts) >= 2 and any("°" in s for s in texts):
-                    try:
-                        idx = max(i for i,s in enumerate(texts) if "°" in s)
-                    except ValueError:
-                        idx = -1
-                    label_parts = [s for s in texts[:idx] if "°" not in s]
-                    if label_parts:
-                        name = " ".join(label_parts).strip()
-
-        pairs.append((name, temp))
-
-    for tr in soup.select("table tr"):
-        tds = [td.get_text(" ", strip=True) for td in tr.select("td")]
-        if len(tds) >= 2 and re.search(r"°\s*C", tds[1]):
-            try:
-                temp = float(re.sub(r"[^\d\-,.]", "", tds[1]).replace(",", "."))
-                name = tds[0] or None
-                pairs.append((name, temp))
-            except Exception:
-                pass
-
-    seen = set()
-    uniq = []
-    for name, temp in pairs:
-        key = (name or "", temp)
-        if key not in seen:
-            seen.add(key)
-            uniq.append((name, temp))
-    return uniq
-
-def month_csv_path(dt):
-    """Ex: data/temperatures_08-2025.csv"""
-    return os.path.join("data", f"temperatures_{dt.strftime('%m-%Y')}.csv")
-
-def read_csv_safe(path: str) -> pd.DataFrame:
-    if not os.path.exists(path) or os.path.getsize(path) == 0:
-        return pd.DataFrame(columns=["timestamp", "capteur", "temperature"])
-    try:
-        df = pd.read_csv(path, sep=None, engine="python")
-    except Exception:
-        df = pd.read_csv(path)
-    df.columns = [str(c).strip().lower() for c in df.columns]
-    if "timestamp" not in df.columns:
-        for c in ["date", "datetime", "time", "horodatage", "temps"]:
-            if c in df.columns:
-                df = df.rename(columns={c: "timestamp"})
-                break
-        else:
-            first = df.columns[0]
-            if first != "timestamp":
-                df = df.rename(columns={first: "timestamp"})
-    if "capteur" not in df.columns:
-        for c in ["sensor", "probe", "cap"]:
-            if c in df.columns:
-                df = df.rename(columns={c: "capteur"})
-                break
-    if "temperature" not in df.columns:
-        for c in ["temp", "t", "valeur"]:
-            if c in df.columns:
-                df = df.rename(columns={c: "temperature"})
-                break
-    keep = [c for c in ["timestamp", "capteur", "temperature"] if c in df.columns]
-    df = df[keep]
-    if "timestamp" in df.columns:
-        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
-    return df
-
-def append_csv_safe(path: str, df_new: pd.DataFrame):
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    exists = os.path.exists(path)
-    empty = (not exists) or os.path.getsize(path) == 0
-    df_new = df_new[["timestamp", "capteur", "temperature"]]
-    df_new.to_csv(path, mode="a" if exists and not empty else "w",
-                  header=empty, index=False)
-
-MINILIDE_URL = "http://192.168.10.107"
 CSV_PATH = "data/temperatures.csv"
 
+# Parc d'appareils, ex : MINILIDE_APPAREILS="labo=http://192.168.10.107,cuisine=http://192.168.10.108"
+APPAREILS = load_appareils()
+
 # Var
 pushbullet_alert_count = 0
 MAX_PUSHBULLET_ALERTS = 3
-PUSHBULLET_TOKEN = os.getenv("PUSHBULLET_TOKEN")
 
 LOG_PATH = "log/monitoring.txt"
-os.makedirs("log", exist_ok=True)
-os.makedirs("data", exist_ok=True)
 HEURES_EXTRACTION = [(7, 0), (12, 0), (18, 30)]
 
 HEURES_REPORT = [
@@ -125,30 +39,15 @@ HEURES_REPORT = [
 
 INTERVAL_MINUTES = 10
 MAX_LOG_LINES = 2000
+# Attente du verrou du journal au démarrage (relevé ponctuel en cours)
+LOCK_WAIT_SECONDS = 120
 
-REFERENCE_TEMPS = {
-    "Capteur 1": (10.0, 30.0),
-    "Capteur 2": (-30, -15),
-    "Capteur 3": (-30, -15),
-    "Capteur 4": (-25, -15),
-    "Capteur 5": (-25, -15),
-    "Capteur 6": (-110, -90),
-    "Capteur 7": (-110, -90),
-    "Capteur 8": (-110, -90),
-    "Capteur 9": (-110, -90),
-    "Capteur 10": (-110, -90),
-    "Capteur 11": (-110, -90),
-    "Capteur 12": (-110, -90),
-    "Capteur 13": (-110, -90),
-    "Capteur 14": (-110, -90),
-    "Capteur 15": (-110, -90),
-    "Capteur 16": (-110, -90)
-}
-
-try:
-    pb = Pushbullet(PUSHBULLET_TOKEN)
-except Exception:
-    pb = None
+# État du collecteur, construit dans le bloc principal une fois le verrou du
+# journal obtenu (les processus d'analyse réimportent ce module).
+policy = None
+gaps = None
+anomalies = None
+fleet = None
 
 def write_log(message):
     now_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -173,67 +72,123 @@ Démarrage du monitoring H24...
     write_log(logo)
 
 def send_alert(message):
-    if pb:
-        try:
-            pb.push_note("Alerte Température Minilide", message)
-            write_log("Alerte envoyée via Pushbullet.")
-        except Exception as e:
-            write_log(f"Échec envoi Pushbullet : {e}")
-    else:
-        write_log("Pushbullet non configuré.")
+    push_alert(message, log=write_log)
 
-def extract_temperatures():
-    global pushbullet_alert_count
+journal = None
 
+def on_commit(written: dict):
+    """Après chaque écriture groupée : log et rafraîchissement du miroir du mois courant."""
+    for path, n in written.items():
+        write_log(f"Températures enregistrées (fichier mensuel : {path}, +{n} lignes)")
+        try:
+            refresh_mirror(path)
+        except Exception as e:
+            write_log(f"Copie vers le miroir de {path} échouée : {e}")
+
+def get_journal() -> WriteAheadBuffer:
+    """Tampon d'écriture, créé au premier usage ; rejoue le journal d'un arrêt brutal."""
+    global journal
+    if journal is None:
+        journal = WriteAheadBuffer(on_commit=on_commit, lock_wait=LOCK_WAIT_SECONDS)
+        replayed = journal.replay()
+        if replayed:
+            write_log(f"Journal rejoué : {replayed} relevés récupérés après un arrêt.")
+    return journal
+
+ring = None
+
+def publish_latest(releves):
+    """Publie les relevés dans l'anneau partagé lu par les tableaux de bord."""
+    global ring
     try:
-        response = requests.get(MINILIDE_URL, timeout=5)
-        response.raise_for_status()
+        if ring is None:
+            ring = RingWriter()
+        ring.write(releves)
     except Exception as e:
-        write_log(f"Échec : Impossible de contacter le Minilide ({e})")
-        return
-
-    pairs = extract_name_temp_from_html(response.text)
-
-    values = [(n, v) for (n, v) in pairs if isinstance(v, (int, float))]
-    if not values:
-        write_log("Aucune température détectée dans la page HTML.")
-        return
-
-
+        write_log(f"Écriture de l'anneau des derniers relevés échouée : {e}")
+
+def libelle_appareil(appareil: str) -> str:
+    return f"Minilide {appareil}" if appareil else "Minilide"
+
+def enregistrer_releves(appareil: str, releves) -> tuple:
+    """
+    Confie les relevés d'un appareil au tampon d'écriture et retourne
+    (messages d'alerte hors plage, messages des nouvelles anomalies).
+    """
+    if not releves:
+        write_log(f"Aucune température détectée dans la page HTML ({libelle_appareil(appareil)}).")
+        return [], []
+
+    alert_messages = out_of_range_messages(appareil, releves)
+    scores, anomaly_messages = anomalies.score_and_alert(appareil, releves)
+    metrics.set("capteurs_anormaux", sum(sc.anomalie for sc in scores), appareil=appareil)
+    for message in anomaly_messages:
+        write_log(f"Anomalie : {message}")
+    fleet.update(appareil, releves, scores)
+
+    #CSV (via le journal, écrit dans le mensuel par groupes)
+    get_journal().append(releves)
+    publish_latest(releves)
+    write_log(f"{len(releves)} températures journalisées ({libelle_appareil(appareil)}).")
+    return alert_messages, anomaly_messages
+
+def next_scheduled_extraction(now: datetime):
+    """Prochaine heure de HEURES_EXTRACTION après now."""
+    candidates = []
+    for hh, mm in HEURES_EXTRACTION:
+        target_time = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
+        if target_time <= now:
+            target_time += timedelta(days=1)
+        candidates.append(target_time)
+    return min(candidates) if candidates else None
+
+def plan_next_poll(appareil: str, releves) -> list:
+    """Planifie le prochain relevé de l'appareil et retourne les trous / capteurs muets détectés."""
     now = datetime.now()
+    decision = policy.observe(appareil, releves)
+    next_expected = next_scheduled_extraction(now)
+    if POLL_ADAPTIVE:
+        next_adaptive = now + timedelta(seconds=decision.interval)
+        next_expected = min(next_expected, next_adaptive) if next_expected else next_adaptive
+        write_log(f"Prochain relevé {libelle_appareil(appareil)} dans {decision.interval:.0f} s "
+                  f"(urgence {decision.urgency:.2f}, {decision.raison}).")
+
+    events = gaps.record_poll(appareil, releves, now, next_expected)
+    metrics.set("capteurs_muets", len(gaps.stale_sensors(appareil)), appareil=appareil)
+    for event in events:
+        write_log(f"Complétude : {event}")
+    return events
+
+@profiled()
+def extract_temperatures(appareils=None):
+    global pushbullet_alert_count
 
-    new_data = []
-    alert_messages = []
-
-    for i, (name, temp) in enumerate(values):
-        capteur = (name or f"Capteur {i+1}").strip()
-
-        new_data.append([now, capteur, temp])
-
-        plage = REFERENCE_TEMPS.get(capteur) or REFERENCE_TEMPS.get(f"Capteur {i+1}")
-        if plage is not None:
-            min_temp, max_temp = plage
-            if temp < min_temp or temp > max_temp:
-                alert_messages.append(f"{capteur}: {temp}°C (hors plage {min_temp}-{max_temp}°C)")
-
-    #CSV
-    df_new = pd.DataFrame(new_data, columns=["timestamp", "capteur", "temperature"])
-
-    month_path = month_csv_path(now)
-    append_csv_safe(month_path, df_new)
+    gap_events = []
 
-    try:
-        df_month = read_csv_safe(month_path)
-        df_month.to_csv(CSV_PATH, index=False)
-    except Exception as e:
-        write_log(f"Copie vers {CSV_PATH} échouée : {e}")
+    def on_error(appareil, e):
+        write_log(f"Échec : Impossible de contacter le {libelle_appareil(appareil)} ({e})")
+        gap_events.extend(plan_next_poll(appareil, []))
 
-    try:
-        total_lines = len(read_csv_safe(month_path))
-    except Exception:
-        total_lines = "?"
-
-    write_log(f"Températures enregistrées (fichier mensuel : {month_path}, total : {total_lines} lignes)")
+    alert_messages = []
+    collected = False
+    for appareil, releves in collect(appareils or APPAREILS, on_error=on_error):
+        collected = collected or bool(releves)
+        hors_plage, nouvelles_anomalies = enregistrer_releves(appareil, releves)
+        alert_messages.extend(hors_plage)
+        gap_events.extend(nouvelles_anomalies)
+        gap_events.extend(plan_next_poll(appareil, releves))
+
+    gaps.save()
+    anomalies.save()
+    fleet.mark_stale(gaps.stale_sensors(), gaps.unreachable_devices())
+    fleet.save()
+    # Trous, capteurs muets, nouvelles anomalies : des transitions, envoyées sans
+    # passer par le compteur d'alertes.
+    if gap_events:
+        send_alert("\n".join(gap_events))
+
+    if not collected:
+        return
 
     if alert_messages:
         if pushbullet_alert_count < MAX_PUSHBULLET_ALERTS:
@@ -248,7 +203,17 @@ def extract_temperatures():
 if __name__ == "__main__":
     last_extraction = None
     last_report = None
+    os.makedirs("log", exist_ok=True)
+    os.makedirs("data", exist_ok=True)
     print_logo()
+    try:
+        get_journal()
+    except JournalLocked as e:
+        write_log(f"Arrêt : {e}")
+        raise SystemExit(2)
+    # État relu une fois le verrou obtenu : un relevé ponctuel a pu l'écrire entre-temps.
+    policy = AdaptivePolicy(reference_range, min_intervals=load_min_intervals())
+    gaps, anomalies, fleet = GapDetector(), AnomalyDetector(), FleetSummary()
 
     while True:
         now = datetime.now()
@@ -272,6 +237,12 @@ if __name__ == "__main__":
                 write_log("Extraction terminée.")
                 last_extraction = (hh, mm)
 
+        if POLL_ADAPTIVE:
+            due_appareils = policy.due(APPAREILS)
+            if due_appareils:
+                write_log(f"--- Relevé adaptatif : {', '.join(libelle_appareil(a) for a, _ in due_appareils)} ---")
+                extract_temperatures(due_appareils)
+
         for jd, hh, mm in HEURES_REPORT:
             target_time = now.replace(hour=hh, minute=mm, second=0, microsecond=0)
             report_tuple = (jd, hh, mm)
@@ -282,5 +253,16 @@ if __name__ == "__main__":
                 write_log("Rapport envoyé.")
                 last_report = report_tuple
 
+        # Les relevés en attente et les relevés adaptatifs ne doivent pas patienter tout l'intervalle.
+        get_journal().maybe_commit()
+        metrics.flush()
+        waits = [get_journal().seconds_until_due()]
+        if POLL_ADAPTIVE:
+            waits.append(policy.seconds_until_next(APPAREILS))
+        wait_s = min([w for w in waits if w is not None], default=INTERVAL_MINUTES * 60)
+        if wait_s < INTERVAL_MINUTES * 60:
+            t.sleep(max(1.0, wait_s))
+            continue
+
         write_log(f"Attente {INTERVAL_MINUTES} minutes avant la prochaine vérification...\n")
         t.sleep(INTERVAL_MINUTES * 60)
\ No newline at end of file
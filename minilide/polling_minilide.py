@@ -0,0 +1,124 @@
+"""
+Fréquence d'interrogation adaptative des appareils.
+
+Après chaque relevé, on calcule pour l'appareil une urgence entre 0 et 1 :
+  - proximité d'une limite de la plage du capteur (1 = hors plage)
+  - vitesse de variation d'un capteur depuis le relevé précédent
+L'intervalle cible va de POLL_BASE_SECONDS (urgence 0) à POLL_FAST_SECONDS
+(urgence 1). On accélère immédiatement, on ralentit progressivement (x2 par
+relevé), et jamais en dessous de l'intervalle minimal de l'appareil
+(suffixe "@60s" dans MINILIDE_APPAREILS, POLL_MIN_SECONDS par défaut).
+"""
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from metrics_minilide import metrics
+
+POLL_ADAPTIVE = os.getenv("MINILIDE_POLL_ADAPTIVE", "1") != "0"
+POLL_BASE_SECONDS = float(os.getenv("MINILIDE_POLL_BASE_SECONDS", "3600"))
+POLL_FAST_SECONDS = float(os.getenv("MINILIDE_POLL_FAST_SECONDS", "60"))
+POLL_MIN_SECONDS = float(os.getenv("MINILIDE_POLL_MIN_SECONDS", "30"))
+# Part de la plage (min, max) en deçà de laquelle on se considère proche d'une limite
+POLL_NEAR_FRACTION = float(os.getenv("MINILIDE_POLL_NEAR_FRACTION", "0.2"))
+# Variation (°C/min) considérée comme rapide
+POLL_FAST_RATE = float(os.getenv("MINILIDE_POLL_FAST_RATE", "0.2"))
+
+
+class Decision(NamedTuple):
+    interval: float
+    urgency: float
+    raison: str
+
+
+def proximity(temp: float, plage: Tuple[float, float], near_fraction: float = POLL_NEAR_FRACTION) -> float:
+    """0 au milieu de la plage, 1 sur une limite ou au-delà."""
+    min_temp, max_temp = plage
+    width = max_temp - min_temp
+    margin = min(temp - min_temp, max_temp - temp)
+    if margin <= 0 or width <= 0:
+        return 1.0
+    near = near_fraction * width
+    return max(0.0, 1.0 - margin / near) if near > 0 else 0.0
+
+
+class AdaptivePolicy:
+    """
+    ranges(capteur, position, appareil) donne la plage d'un capteur ou None
+    (alertes_minilide.reference_range) ; min_intervals, l'intervalle minimal
+    propre à certains appareils (collecteur_minilide.load_min_intervals).
+    """
+
+    def __init__(self, ranges: Callable[[str, int, str], Optional[Tuple[float, float]]],
+                 base: float = POLL_BASE_SECONDS,
+                 fast: float = POLL_FAST_SECONDS,
+                 min_interval: float = POLL_MIN_SECONDS,
+                 fast_rate: float = POLL_FAST_RATE,
+                 min_intervals: Optional[Dict[str, float]] = None):
+        self.ranges = ranges
+        self.base = base
+        self.fast = fast
+        self.min_interval = min_interval
+        self.min_intervals = dict(min_intervals or {})
+        self.fast_rate = fast_rate
+        self._interval: Dict[str, float] = {}
+        self._next: Dict[str, float] = {}
+        self._last: Dict[Tuple[str, str], Tuple[float, float]] = {}
+
+    def min_interval_for(self, appareil: str) -> float:
+        return self.min_intervals.get(appareil, self.min_interval)
+
+    def _urgency(self, appareil: str, releves) -> Tuple[float, str]:
+        urgency, raison = 0.0, "stable"
+        for i, r in enumerate(releves):
+            plage = self.ranges(r.capteur, i, appareil)
+            if plage is not None:
+                p = proximity(r.temperature, plage)
+                if p > urgency:
+                    urgency, raison = p, "proche_limite"
+
+            prev = self._last.get((appareil, r.capteur))
+            ts = r.timestamp.timestamp()
+            if prev is not None and ts > prev[0] and self.fast_rate > 0:
+                rate = abs(r.temperature - prev[1]) / ((ts - prev[0]) / 60)
+                score = min(1.0, rate / self.fast_rate)
+                if score > urgency:
+                    urgency, raison = score, "variation_rapide"
+            self._last[(appareil, r.capteur)] = (ts, r.temperature)
+        return urgency, raison
+
+    def observe(self, appareil: str, releves, now: Optional[float] = None) -> Decision:
+        """Enregistre un relevé (liste vide = échec) et planifie le suivant."""
+        now = time.monotonic() if now is None else now
+        current = self._interval.get(appareil, self.base)
+
+        if not releves:
+            # Appareil muet : on garde le rythme, inutile de le solliciter davantage.
+            decision = Decision(current, 0.0, "echec")
+        else:
+            floor = self.min_interval_for(appareil)
+            fast = max(self.fast, floor)
+            urgency, raison = self._urgency(appareil, releves)
+            target = self.base - (self.base - fast) * urgency
+            interval = target if target <= current else min(target, current * 2)
+            if interval >= self.base:
+                raison = "base"
+            decision = Decision(max(floor, interval), urgency, raison)
+
+        self._interval[appareil] = decision.interval
+        self._next[appareil] = now + decision.interval
+
+        metrics.set("poll_interval_seconds", round(decision.interval, 1), appareil=appareil)
+        metrics.set("poll_urgency", round(decision.urgency, 3), appareil=appareil)
+        metrics.inc("poll_decisions_total", appareil=appareil, raison=decision.raison)
+        return decision
+
+    def due(self, appareils: List[Tuple[str, str]], now: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Appareils à interroger maintenant (jamais interrogés compris)."""
+        now = time.monotonic() if now is None else now
+        return [a for a in appareils if self._next.get(a[0], now) <= now]
+
+    def seconds_until_next(self, appareils: List[Tuple[str, str]], now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        nexts = [self._next.get(nom, now) for nom, _ in appareils]
+        return max(0.0, min(nexts) - now) if nexts else self.base
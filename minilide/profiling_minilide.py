@@ -0,0 +1,133 @@
+"""
+Profilage à la demande des chemins critiques (collecte, interface, rapports).
+
+Activation : MINILIDE_PROFILE=cpu | mem | cpu,mem, ou en ligne de commande
+--profile=cpu / --profile cpu (--profile seul : MINILIDE_PROFILE, sinon cpu,mem).
+Sans activation, @profiled rend la fonction telle quelle : aucun surcoût.
+
+Une fraction MINILIDE_PROFILE_SAMPLE des invocations est profilée (défaut 1.0 :
+toutes ; 0.05 suffit en production). Pour chacune on écrit dans log/profiles/ :
+  - <nom>_<horodatage>.prof : profil cProfile (lisible avec pstats / snakeviz)
+  - <nom>_<horodatage>.txt  : top MINILIDE_PROFILE_TOP fonctions et allocations
+Seuls les MINILIDE_PROFILE_KEEP derniers profils sont conservés.
+"""
+import functools
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+PROFILE_DIR = os.path.join("log", "profiles")
+PROFILE_SAMPLE = float(os.getenv("MINILIDE_PROFILE_SAMPLE", "1.0"))
+PROFILE_TOP = int(os.getenv("MINILIDE_PROFILE_TOP", "20"))
+PROFILE_KEEP = int(os.getenv("MINILIDE_PROFILE_KEEP", "200"))
+
+
+MODE_NAMES = {"cpu", "mem", "1", "on", "all"}
+
+
+def _parse_spec(spec: str) -> set:
+    return {m.strip().lower() for m in spec.split(",") if m.strip()}
+
+def _modes(argv=None) -> set:
+    argv = sys.argv[1:] if argv is None else argv
+    spec = os.getenv("MINILIDE_PROFILE", "")
+    for i, arg in enumerate(argv):
+        if arg.startswith("--profile="):
+            spec = arg.split("=", 1)[1]
+        elif arg == "--profile":
+            # La valeur suivante n'est prise que si ce sont des modes : pas
+            # d'argument du script avalé par erreur.
+            value = argv[i + 1] if i + 1 < len(argv) else ""
+            if value and _parse_spec(value) <= MODE_NAMES:
+                spec = value
+            else:
+                spec = spec or "cpu,mem"
+    modes = _parse_spec(spec)
+    if modes & {"1", "on", "all"}:
+        modes = {"cpu", "mem"}
+    return modes & {"cpu", "mem"}
+
+
+PROFILE_MODES = _modes()
+_active = threading.local()
+
+
+def _prune():
+    import glob
+
+    files = sorted(glob.glob(os.path.join(PROFILE_DIR, "*")), key=os.path.getmtime)
+    for p in files[:max(0, len(files) - 2 * PROFILE_KEEP)]:
+        try:
+            os.remove(p)
+        except OSError:
+            pass
+
+def _run_profiled(name: str, func, args, kwargs):
+    import cProfile
+    import tracemalloc
+
+    prof = cProfile.Profile() if "cpu" in PROFILE_MODES else None
+    started_tracing = False
+    if "mem" in PROFILE_MODES and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+
+    _active.on = True
+    t0 = time.perf_counter()
+    try:
+        if prof:
+            return prof.runcall(func, *args, **kwargs)
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.perf_counter() - t0
+        _active.on = False
+        snapshot = tracemalloc.take_snapshot() if "mem" in PROFILE_MODES and tracemalloc.is_tracing() else None
+        peak = tracemalloc.get_traced_memory()[1] if snapshot else 0
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            _write_report(name, elapsed, prof, snapshot, peak)
+        except Exception as e:
+            print(f"[WARN] Profil {name} non écrit : {e}")
+
+def _write_report(name: str, elapsed: float, prof, snapshot, peak: int):
+    import io
+    import pstats
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    base = os.path.join(PROFILE_DIR, f"{name}_{stamp}")
+
+    out = io.StringIO()
+    out.write(f"{name} — {datetime.now():%Y-%m-%d %H:%M:%S} — {elapsed * 1000:.1f} ms\n\n")
+    if prof:
+        prof.dump_stats(base + ".prof")
+        out.write(f"--- Top {PROFILE_TOP} (temps cumulé) ---\n")
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    if snapshot:
+        out.write(f"--- Mémoire : pic {peak / 1024:.0f} Kio, top {PROFILE_TOP} allocations ---\n")
+        for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+            out.write(f"{stat}\n")
+
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(out.getvalue())
+    _prune()
+
+def profiled(name: str = None):
+    """Décorateur : profile la fonction quand le profilage est activé."""
+    def decorator(func):
+        if not PROFILE_MODES:
+            return func
+        label = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Appel imbriqué dans une fonction déjà profilée : déjà couvert.
+            if getattr(_active, "on", False) or random.random() >= PROFILE_SAMPLE:
+                return func(*args, **kwargs)
+            return _run_profiled(label, func, args, kwargs)
+        return wrapper
+    return decorator
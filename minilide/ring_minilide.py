@@ -0,0 +1,225 @@
+"""
+Derniers relevés partagés entre le collecteur et les tableaux de bord.
+
+Fichier data/latest.ring projeté en mémoire (mmap) :
+  - un en-tête (géométrie, date de création, compteur de séquence global)
+  - un emplacement de taille fixe par (appareil, capteur), avec un anneau des
+    `history` derniers relevés (horodatage, température)
+
+Un seul écrivain (le collecteur) ; les lecteurs, en nombre quelconque, ne
+prennent aucun verrou : chaque emplacement porte un compteur de séquence
+(impair pendant une écriture), le lecteur recommence si le compteur a bougé.
+"""
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+RING_PATH = os.path.join("data", "latest.ring")
+RING_SLOTS = int(os.getenv("MINILIDE_RING_SLOTS", "256"))
+RING_HISTORY = int(os.getenv("MINILIDE_RING_HISTORY", "288"))
+
+MAGIC = b"MLRING1\0"
+VERSION = 1
+# magic, version, slots, history, slots utilisés, séquence globale, création (epoch)
+HEADER = struct.Struct("<8sIIIIQd")
+HEADER_SIZE = 64
+SEQ_OFFSET = 24
+USED_OFFSET = 20
+# séquence, tête, nombre, appareil, capteur
+APPAREIL_BYTES = 32
+CAPTEUR_BYTES = 48
+SLOT_HEAD = struct.Struct(f"<QII{APPAREIL_BYTES}s{CAPTEUR_BYTES}s")
+SAMPLE = struct.Struct("<dd")
+MAX_RETRIES = 100
+
+
+def _slot_size(history: int) -> int:
+    return SLOT_HEAD.size + history * SAMPLE.size
+
+def _encode(text: str, size: int) -> bytes:
+    """Nom tel que stocké dans l'emplacement : coupé à size octets, sans couper un caractère."""
+    return text.encode("utf-8")[:size].decode("utf-8", errors="ignore").encode("utf-8")
+
+def _decode(raw: bytes) -> str:
+    return raw.rstrip(b"\0").decode("utf-8", errors="replace")
+
+
+class RingWriter:
+    """Côté collecteur : crée (ou reprend) l'anneau et y écrit les relevés."""
+
+    def __init__(self, path: str = RING_PATH, slots: int = RING_SLOTS, history: int = RING_HISTORY):
+        self.path = path
+        self.slots = slots
+        self.history = history
+        self.slot_size = _slot_size(history)
+        size = HEADER_SIZE + slots * self.slot_size
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        reuse = False
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            with open(path, "rb") as f:
+                magic, version, n, h, _, _, _ = HEADER.unpack(f.read(HEADER.size))
+            reuse = (magic, version, n, h) == (MAGIC, VERSION, slots, history)
+
+        if not reuse:
+            # Nouveau fichier puis remplacement : un lecteur encore ouvert sur
+            # l'ancien garde une projection valide.
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, VERSION, slots, history, 0, 0, time.time()))
+                f.truncate(size)
+            os.replace(tmp_path, path)
+
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        # Clé = noms tels que stockés (coupés), pour retrouver les emplacements après un redémarrage.
+        self._index: Dict[Tuple[bytes, bytes], int] = {}
+        self._owners: Dict[Tuple[bytes, bytes], Tuple[str, str]] = {}
+        self._warned = set()
+        used = struct.unpack_from("<I", self._mm, USED_OFFSET)[0]
+        for i in range(min(used, slots)):
+            _, _, _, app, cap = SLOT_HEAD.unpack_from(self._mm, self._slot_offset(i))
+            self._index[(app.rstrip(b"\0"), cap.rstrip(b"\0"))] = i
+
+    def _slot_offset(self, i: int) -> int:
+        return HEADER_SIZE + i * self.slot_size
+
+    def _warn_once(self, key, message: str):
+        if key not in self._warned:
+            self._warned.add(key)
+            print(f"[WARN] {message}")
+
+    def _slot_for(self, appareil: str, capteur: str) -> Optional[int]:
+        key = (_encode(appareil, APPAREIL_BYTES), _encode(capteur, CAPTEUR_BYTES))
+        # Deux noms complets identiques une fois coupés : le second est refusé
+        # plutôt que de mélanger leurs relevés.
+        owner = self._owners.setdefault(key, (appareil, capteur))
+        if owner != (appareil, capteur):
+            self._warn_once((appareil, capteur),
+                            f"Anneau : {appareil} {capteur} ignoré, même nom tronqué que {owner[0]} {owner[1]}")
+            return None
+        if key in self._index:
+            return self._index[key]
+        used = len(self._index)
+        if used >= self.slots:
+            self._warn_once((appareil, capteur),
+                            f"Anneau plein ({self.slots} emplacements) : {appareil} {capteur} ignoré "
+                            f"(augmenter MINILIDE_RING_SLOTS)")
+            return None
+        off = self._slot_offset(used)
+        SLOT_HEAD.pack_into(self._mm, off, 0, 0, 0, key[0], key[1])
+        self._index[key] = used
+        struct.pack_into("<I", self._mm, USED_OFFSET, used + 1)
+        return used
+
+    def write(self, releves) -> int:
+        """Ajoute les relevés à l'anneau. Retourne le nombre de relevés écrits."""
+        n = 0
+        for r in releves:
+            i = self._slot_for(r.appareil, r.capteur)
+            if i is None:
+                continue
+            off = self._slot_offset(i)
+            seq, head, count, app, cap = SLOT_HEAD.unpack_from(self._mm, off)
+            SLOT_HEAD.pack_into(self._mm, off, seq + 1, head, count, app, cap)  # impair : écriture en cours
+            SAMPLE.pack_into(self._mm, off + SLOT_HEAD.size + head * SAMPLE.size,
+                             r.timestamp.timestamp(), float(r.temperature))
+            SLOT_HEAD.pack_into(self._mm, off, seq + 2, (head + 1) % self.history,
+                                min(count + 1, self.history), app, cap)
+            n += 1
+        if n:
+            seq = struct.unpack_from("<Q", self._mm, SEQ_OFFSET)[0]
+            struct.pack_into("<Q", self._mm, SEQ_OFFSET, seq + 1)
+        return n
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+
+class RingReader:
+    """Côté tableau de bord : lecture sans verrou ni analyse de fichier."""
+
+    def __init__(self, path: str = RING_PATH):
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.slots, self.history, _, _, self.created_at = HEADER.unpack_from(self._mm, 0)
+        if (magic, version) != (MAGIC, VERSION):
+            self.close()
+            raise ValueError(f"{path} n'est pas un anneau Minilide valide.")
+        self.slot_size = _slot_size(self.history)
+
+    @classmethod
+    def open(cls, path: str = RING_PATH) -> Optional["RingReader"]:
+        """Lecteur sur l'anneau, ou None s'il n'existe pas (collecteur jamais lancé)."""
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    @property
+    def sequence(self) -> int:
+        """Compteur incrémenté à chaque écriture : inchangé = rien de nouveau."""
+        return struct.unpack_from("<Q", self._mm, SEQ_OFFSET)[0]
+
+    def _read_slot(self, i: int):
+        off = HEADER_SIZE + i * self.slot_size
+        for _ in range(MAX_RETRIES):
+            seq, head, count, app, cap = SLOT_HEAD.unpack_from(self._mm, off)
+            if seq & 1:
+                continue
+            raw = self._mm[off + SLOT_HEAD.size: off + self.slot_size]
+            if SLOT_HEAD.unpack_from(self._mm, off)[0] != seq:
+                continue
+            start = (head - count) % self.history
+            samples = [SAMPLE.unpack_from(raw, ((start + k) % self.history) * SAMPLE.size)
+                       for k in range(count)]
+            return _decode(app), _decode(cap), samples
+        return None
+
+    def _slots(self):
+        used = struct.unpack_from("<I", self._mm, USED_OFFSET)[0]
+        for i in range(min(used, self.slots)):
+            slot = self._read_slot(i)
+            if slot is not None:
+                yield slot
+
+    def history_by_sensor(self, appareil: Optional[str] = None,
+                          since: Optional[datetime] = None
+                          ) -> List[Tuple[str, str, List[Tuple[datetime, float]]]]:
+        """[(appareil, capteur, [(horodatage, température), ...])] du plus ancien au plus récent."""
+        since_ts = since.timestamp() if since else None
+        out = []
+        for app, cap, samples in self._slots():
+            if appareil is not None and app != appareil:
+                continue
+            points = [(datetime.fromtimestamp(ts), temp) for ts, temp in samples
+                      if since_ts is None or ts >= since_ts]
+            out.append((app, cap, points))
+        return out
+
+    def latest(self, appareil: Optional[str] = None) -> List[Tuple[str, str, datetime, float]]:
+        """Dernière valeur de chaque (appareil, capteur)."""
+        return [(app, cap, points[-1][0], points[-1][1])
+                for app, cap, points in self.history_by_sensor(appareil)
+                if points]
+
+    def covers(self, since: datetime, appareil: Optional[str] = None) -> bool:
+        """Vrai si l'anneau contient tous les relevés depuis `since` (sinon : repli sur le CSV)."""
+        if self.created_at > since.timestamp():
+            return False
+        since_ts = since.timestamp()
+        for app, _, samples in self._slots():
+            if appareil is not None and app != appareil:
+                continue
+            if len(samples) >= self.history and samples[0][0] > since_ts:
+                return False
+        return True
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
@@ -10,6 +10,9 @@ import matplotlib.pyplot as plt
 
 load_dotenv()
 
+from gaps_minilide import completeness
+from profiling_minilide import profiled
+
 # --- Chemins / SMTP / Destinataires ---
 CSV_MIRROR = "data/temperatures.csv"   # miroir du mois courant (secours)
 SMTP_SERVER = os.getenv("SMTP_SERVER")
@@ -52,10 +55,11 @@ def load_month_dataframe() -> pd.DataFrame:
     df = df.dropna(subset=["timestamp"])  # on garde les lignes avec timestamp valide
     return df
 
+@profiled()
 def build_month_stats(df: pd.DataFrame):
     """
     Calcule les stats par capteur sur tout le mois :
-    n / min / max / moyenne / dernière valeur.
+    n / min / max / moyenne / dernière valeur / complétude (relevés reçus / attendus).
     Retourne: stats_capteurs (DataFrame), df_all (DataFrame trié).
     """
     df_all = df.copy().sort_values("timestamp")
@@ -77,17 +81,26 @@ def build_month_stats(df: pd.DataFrame):
         "last": last_vals
     }).sort_index()
 
+    # Complétude tenue par le monitoring (vide si le suivi n'a pas tourné ce mois-ci)
+    now = datetime.now()
+    counts = completeness(now.year, now.month)
+    stats_capteurs["completude"] = [
+        counts[c][0] / counts[c][1] if c in counts and counts[c][1] else float("nan")
+        for c in stats_capteurs.index
+    ]
+
     # Remap noms capteurs
     pretty_index = [NOM_CAPTEURS.get(c, c) for c in stats_capteurs.index]
     stats_capteurs.index = pretty_index
 
     return stats_capteurs, df_all
 
+@profiled()
 def render_pdf_month(stats_caps: pd.DataFrame, df_all: pd.DataFrame, out_pdf: str):
     """
     Génére un PDF mensuel avec :
       - Titre / période
-      - Tableau de synthèse (n / min / max / moy) avec en-tête coloré
+      - Tableau de synthèse (n / min / max / moy / complétude) avec en-tête coloré
       - Graph global des températures du mois (légende à droite)
     """
     now = datetime.now()
@@ -102,6 +115,9 @@ def render_pdf_month(stats_caps: pd.DataFrame, df_all: pd.DataFrame, out_pdf: st
     pdf.cell(0, 10, "Rapport mensuel - Températures", ln=1)
     pdf.set_font("Arial", '', 11)
     pdf.cell(0, 8, f"Période : {periode}", ln=1)
+    recus, attendus = completeness(now.year, now.month).get("*", (0, 0))
+    if attendus:
+        pdf.cell(0, 8, f"Relevés effectués : {recus} / {attendus} planifiés ({recus / attendus:.0%})", ln=1)
 
     # --- Tableau synthèse ---
     pdf.ln(2)
@@ -113,8 +129,8 @@ def render_pdf_month(stats_caps: pd.DataFrame, df_all: pd.DataFrame, out_pdf: st
     pdf.set_text_color(255, 255, 255)  # blanc
     pdf.set_font("Arial", 'B', 10)
 
-    headers = ["Capteur", "n", "min", "max", "moy"]
-    col_w = [60, 20, 25, 25, 25]
+    headers = ["Capteur", "n", "min", "max", "moy", "compl."]
+    col_w = [60, 20, 25, 25, 25, 25]
 
     for w, h in zip(col_w, headers):
         pdf.cell(w, 8, h, 1, 0, 'C', True)
@@ -130,6 +146,7 @@ def render_pdf_month(stats_caps: pd.DataFrame, df_all: pd.DataFrame, out_pdf: st
         pdf.cell(col_w[2], 8, f"{row['min']:.1f}" if pd.notna(row["min"]) else "—", 1, 0, 'C')
         pdf.cell(col_w[3], 8, f"{row['max']:.1f}" if pd.notna(row["max"]) else "—", 1, 0, 'C')
         pdf.cell(col_w[4], 8, f"{row['mean']:.1f}" if pd.notna(row["mean"]) else "—", 1, 0, 'C')
+        pdf.cell(col_w[5], 8, f"{row['completude']:.0%}" if pd.notna(row["completude"]) else "—", 1, 0, 'C')
         pdf.ln()
 
     # --- Graph global (températures du mois) ---
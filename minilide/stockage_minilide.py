@@ -0,0 +1,83 @@
+"""
+Stockage des relevés : partitions mensuelles data/temperatures_MM-YYYY.csv
+(data/<appareil>/... pour les appareils nommés) et lecture tolérante des CSV.
+
+pandas n'est importé que par les fonctions qui s'en servent : le relevé ponctuel
+(extract_minilide.py) écrit ses lignes sans jamais le charger.
+"""
+import os
+import shutil
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+COLUMNS = ["timestamp", "capteur", "temperature"]
+
+# Noms de colonnes acceptés dans les exports (en minuscules)
+TIMESTAMP_ALIASES = ["date", "datetime", "time", "horodatage", "temps"]
+CAPTEUR_ALIASES = ["sensor", "probe", "cap"]
+TEMPERATURE_ALIASES = ["temp", "t", "valeur"]
+
+
+def appareil_dir(appareil: str = "") -> str:
+    """Dossier de données d'un appareil : data/ pour l'appareil historique, data/<nom>/ sinon."""
+    return os.path.join("data", appareil) if appareil else "data"
+
+def month_csv_path(dt, appareil: str = ""):
+    """Ex: data/temperatures_08-2025.csv"""
+    return os.path.join(appareil_dir(appareil), f"temperatures_{dt.strftime('%m-%Y')}.csv")
+
+def refresh_mirror(path: str) -> bool:
+    """Recopie une partition vers son miroir temperatures.csv si c'est celle du mois courant."""
+    if os.path.basename(path) != os.path.basename(month_csv_path(datetime.now())):
+        return False
+    shutil.copyfile(path, os.path.join(os.path.dirname(path), "temperatures.csv"))
+    return True
+
+def normalize_columns(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Ramène les colonnes d'un export aux colonnes timestamp / capteur / temperature."""
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    if "timestamp" not in df.columns:
+        for c in TIMESTAMP_ALIASES:
+            if c in df.columns:
+                df = df.rename(columns={c: "timestamp"})
+                break
+        else:
+            first = df.columns[0]
+            if first != "timestamp":
+                df = df.rename(columns={first: "timestamp"})
+    if "capteur" not in df.columns:
+        for c in CAPTEUR_ALIASES:
+            if c in df.columns:
+                df = df.rename(columns={c: "capteur"})
+                break
+    if "temperature" not in df.columns:
+        for c in TEMPERATURE_ALIASES:
+            if c in df.columns:
+                df = df.rename(columns={c: "temperature"})
+                break
+    keep = [c for c in COLUMNS if c in df.columns]
+    return df[keep]
+
+def read_csv_safe(path: str) -> "pd.DataFrame":
+    import pandas as pd
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return pd.DataFrame(columns=COLUMNS)
+    try:
+        df = pd.read_csv(path, sep=None, engine="python")
+    except Exception:
+        df = pd.read_csv(path)
+    df = normalize_columns(df)
+    if "timestamp" in df.columns:
+        df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    return df
+
+def append_csv_safe(path: str, df_new: "pd.DataFrame"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    exists = os.path.exists(path)
+    empty = (not exists) or os.path.getsize(path) == 0
+    df_new = df_new[COLUMNS]
+    df_new.to_csv(path, mode="a" if exists and not empty else "w",
+                  header=empty, index=False)
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# Les scripts Minilide sont des modules à plat dans minilide/, lancés depuis ce dossier.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "minilide"))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Dossier de travail vide : les modules écrivent dans data/ relatif."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
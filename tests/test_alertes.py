@@ -0,0 +1,43 @@
+import json
+from datetime import datetime
+
+from alertes_minilide import out_of_range_messages, reference_range
+from collecteur_minilide import Releve
+from flotte_minilide import load_noms
+
+T0 = datetime(2025, 9, 1, 7, 0)
+
+CAPTEURS = {
+    "labo": {"noms": {"Sonde A": "LABO Ambiant"}, "plages": {"Sonde A": [15, 25]}},
+    "cuisine": {"Capteur 1": "Chambre froide"},
+    "": {"plages": {"Capteur 1": [0, 5]}},
+}
+
+
+def write_capteurs(conf=CAPTEURS):
+    with open("capteurs.json", "w", encoding="utf-8") as f:
+        json.dump(conf, f)
+
+
+def test_plages_par_appareil(workdir):
+    write_capteurs()
+    # Appareil historique : capteurs.json, puis REFERENCE_TEMPS par nom ou par position.
+    assert reference_range("Capteur 1", 0) == (0.0, 5.0)
+    assert reference_range("Capteur 2", 1) == (-30, -15)
+    assert reference_range("Sonde", 1) == (-30, -15)
+    # Appareil nommé : seulement ses plages déclarées, jamais la position.
+    assert reference_range("Sonde A", 0, "labo") == (15.0, 25.0)
+    assert reference_range("Sonde B", 1, "labo") is None
+    assert reference_range("Capteur 2", 1, "cuisine") is None
+
+
+def test_alertes_hors_plage(workdir):
+    write_capteurs()
+    releves = [Releve("labo", T0, "Sonde A", 30.0), Releve("labo", T0, "Capteur 2", 30.0)]
+    assert out_of_range_messages("labo", releves) == ["[labo] Sonde A: 30.0°C (hors plage 15.0-25.0°C)"]
+
+
+def test_noms_deux_formats(workdir):
+    write_capteurs()
+    assert load_noms() == {"labo": {"Sonde A": "LABO Ambiant"},
+                           "cuisine": {"Capteur 1": "Chambre froide"}, "": {}}
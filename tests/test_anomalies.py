@@ -0,0 +1,57 @@
+import copy
+import os
+from datetime import datetime, timedelta
+
+from anomalies_minilide import AnomalyDetector
+from collecteur_minilide import Releve
+
+T0 = datetime(2025, 1, 6)
+PATH = os.path.join("data", "anomalies.json")
+
+
+def releve(heure, temp):
+    return [Releve("labo", T0 + timedelta(hours=heure), "Congélateur", temp)]
+
+
+def stable(heure):
+    return -20 + 0.1 * (heure % 3 - 1)
+
+
+def test_releves_rejoues_ignores(workdir):
+    detector = AnomalyDetector(PATH)
+    for h in range(10):
+        detector.score("labo", releve(h, stable(h)))
+    detector.save()
+
+    detector = AnomalyDetector(PATH)
+    avant = copy.deepcopy(detector.state["labo"]["Congélateur"])
+    # Journal rejoué après un redémarrage : relevés déjà intégrés, même très écartés.
+    assert detector.score("labo", releve(9, 50.0) + releve(5, 50.0)) == []
+    assert detector.state["labo"]["Congélateur"] == avant
+    assert len(detector.score("labo", releve(10, stable(10)))) == 1
+
+
+def test_derive_lente_signalee(workdir):
+    # Seuil d'écart très haut : seule la dérive peut déclencher.
+    detector = AnomalyDetector(PATH, z_threshold=10, drift_threshold=3, warmup_hours=48)
+    for h in range(96):
+        scores, messages = detector.score_and_alert("labo", releve(h, stable(h)))
+        assert not scores[0].anomalie and messages == []
+
+    # Remontée lente (+0,05 °C/h) : encore "dans la plage", mais dérive.
+    alertes = []
+    for h in range(96, 160):
+        scores, messages = detector.score_and_alert("labo", releve(h, -20 + 0.05 * (h - 96)))
+        alertes.extend(messages)
+        if scores[0].anomalie:
+            break
+    assert scores[0].anomalie
+    assert scores[0].derive >= 3 and abs(scores[0].z) < 10
+    assert scores[0].temperature < -17
+    assert len(alertes) == 1 and alertes[0].startswith("[labo] Congélateur:")
+
+
+def test_pas_d_alerte_pendant_l_apprentissage(workdir):
+    detector = AnomalyDetector(PATH, warmup_hours=48)
+    detector.score("labo", releve(0, -20.0))
+    assert not detector.score("labo", releve(1, 5.0))[0].anomalie
@@ -0,0 +1,147 @@
+import json
+import os
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from archive_minilide import (HOURLY, RAW, YearArchive, archive_month, compact, downsample,
+                              known_appareils, read_range)
+from journal_minilide import PartitionLocked, acquire_partition_lock, release_lock
+from stockage_minilide import month_csv_path
+
+JANVIER = [("2020-01-01 07:00:00", 20.5), ("2020-01-01 07:30:00", 21.5), ("2020-01-01 09:00:00", 19.0)]
+JUIN = [("2020-06-01 08:00:00", -19.0)]
+
+
+def archive_files():
+    return sorted(f for f in os.listdir(os.path.join("data", "archives")) if f.endswith(".arc"))
+
+
+def test_blocs_lus_a_l_identique(workdir):
+    arc = YearArchive(2020)
+    arc.write_blocks(RAW, {("Capteur 1", "2020-01-01"): JANVIER})
+    arc = YearArchive(2020)
+    assert arc.read_block(RAW, "Capteur 1", "2020-01-01") == [[ts, str(t)] for ts, t in JANVIER]
+    assert arc.read_block(RAW, "Capteur 1", "2020-01-02") == []
+
+
+def test_downsample_et_rewrite(workdir):
+    arc = YearArchive(2020)
+    arc.write_blocks(RAW, {("Capteur 1", "2020-01-01"): JANVIER, ("Capteur 2", "2020-06-01"): JUIN})
+    assert archive_files() == ["temperatures_2020.arc"]
+
+    assert downsample(before=date(2020, 3, 1)) == 1
+    # Réécriture dans une nouvelle génération, l'ancienne supprimée.
+    assert archive_files() == ["temperatures_2020.1.arc"]
+    arc = YearArchive(2020)
+    assert arc.index["fichier"] == "temperatures_2020.1.arc"
+    assert arc.read_block(HOURLY, "Capteur 1", "2020-01-01") == [
+        ["2020-01-01 07:00:00", "2", "20.5", "21.5", "21.0"],
+        ["2020-01-01 09:00:00", "1", "19.0", "19.0", "19.0"],
+    ]
+    assert arc.read_block(RAW, "Capteur 1", "2020-01-01") == []
+    assert arc.read_block(RAW, "Capteur 2", "2020-06-01") == [["2020-06-01 08:00:00", "-19.0"]]
+
+    # Rien de plus à agréger : aucune réécriture.
+    assert downsample(before=date(2020, 3, 1)) == 0
+    assert archive_files() == ["temperatures_2020.1.arc"]
+
+
+def test_rewrite_interrompue_avant_l_index(workdir):
+    arc = YearArchive(2020)
+    arc.write_blocks(RAW, {("Capteur 1", "2020-01-01"): JANVIER})
+    # Nouvelle génération écrite mais index jamais basculé : l'ancien reste valable.
+    with open(os.path.join("data", "archives", "temperatures_2020.1.arc"), "wb") as f:
+        f.write(b"incomplet")
+    arc = YearArchive(2020)
+    assert arc.read_block(RAW, "Capteur 1", "2020-01-01")[0] == ["2020-01-01 07:00:00", "20.5"]
+
+    arc.rewrite()
+    assert archive_files() == ["temperatures_2020.1.arc"]
+    assert YearArchive(2020).read_block(RAW, "Capteur 1", "2020-01-01")[0] == ["2020-01-01 07:00:00", "20.5"]
+
+
+def test_index_sans_fichier(workdir):
+    arc = YearArchive(2020)
+    arc.write_blocks(RAW, {("Capteur 1", "2020-01-01"): JANVIER})
+    with open(arc.index_path, encoding="utf-8") as f:
+        index = json.load(f)
+    del index["fichier"]
+    with open(arc.index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    assert YearArchive(2020).read_block(RAW, "Capteur 1", "2020-01-01")[2] == ["2020-01-01 09:00:00", "19.0"]
+
+
+def test_archive_month_puis_read_range(workdir):
+    path = month_csv_path(datetime(2020, 1, 1))
+    os.makedirs("data", exist_ok=True)
+    pd.DataFrame([(ts, "Capteur 1", t) for ts, t in JANVIER],
+                 columns=["timestamp", "capteur", "temperature"]).to_csv(path, index=False)
+
+    assert archive_month(path) == 3
+    assert not os.path.exists(path)
+    df = read_range(datetime(2020, 1, 1), datetime(2020, 1, 1, 23, 59))
+    assert df["temperature"].tolist() == [20.5, 21.5, 19.0]
+
+    downsample(before=date(2020, 3, 1))
+    df = read_range(datetime(2020, 1, 1), datetime(2020, 1, 1, 23, 59), capteur="Capteur 1")
+    assert df["temperature"].tolist() == [21.0, 19.0]
+
+
+def test_read_range_mois_archive_avec_csv(workdir):
+    path = month_csv_path(datetime(2020, 1, 1))
+    os.makedirs("data", exist_ok=True)
+    pd.DataFrame([(ts, "Capteur 1", t) for ts, t in JANVIER[:2]],
+                 columns=["timestamp", "capteur", "temperature"]).to_csv(path, index=False)
+    archive_month(path)
+
+    # Import tardif après l'archivage : un doublon et un relevé nouveau.
+    pd.DataFrame([(ts, "Capteur 1", t) for ts, t in JANVIER[1:]],
+                 columns=["timestamp", "capteur", "temperature"]).to_csv(path, index=False)
+    df = read_range(datetime(2020, 1, 1), datetime(2020, 1, 1, 23, 59))
+    assert df["temperature"].tolist() == [20.5, 21.5, 19.0]
+
+
+def test_agregats_horaires_combines(workdir):
+    arc = YearArchive(2020)
+    arc.write_blocks(HOURLY, {("Capteur 1", "2020-01-01"): [("2020-01-01 07:00:00", 2, 20.5, 21.5, 21.0)]})
+    arc.write_blocks(HOURLY, {("Capteur 1", "2020-01-01"): [("2020-01-01 07:00:00", 1, 18.0, 18.0, 18.0),
+                                                            ("2020-01-01 08:00:00", 1, 19.0, 19.0, 19.0)]})
+    assert YearArchive(2020).read_block(HOURLY, "Capteur 1", "2020-01-01") == [
+        ["2020-01-01 07:00:00", "3", "18.0", "21.5", "20.0"],
+        ["2020-01-01 08:00:00", "1", "19.0", "19.0", "19.0"],
+    ]
+
+
+def test_archive_month_sous_verrou_de_partition(workdir):
+    path = month_csv_path(datetime(2020, 1, 1))
+    os.makedirs("data", exist_ok=True)
+    pd.DataFrame([(ts, "Capteur 1", t) for ts, t in JANVIER],
+                 columns=["timestamp", "capteur", "temperature"]).to_csv(path, index=False)
+
+    lock = acquire_partition_lock(path)  # import en cours sur ce mois
+    try:
+        with pytest.raises(PartitionLocked):
+            archive_month(path, wait_seconds=0)
+        assert os.path.exists(path)
+    finally:
+        release_lock(lock)
+    assert archive_month(path, wait_seconds=0) == 3
+    assert not os.path.exists(path)
+
+
+def test_compact_tous_les_appareils(workdir, monkeypatch):
+    monkeypatch.setenv("MINILIDE_APPAREILS", "labo=http://labo,cuisine=http://cuisine")
+    for appareil in ("", "labo", "ancien"):
+        path = month_csv_path(datetime(2020, 1, 1), appareil)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pd.DataFrame([(ts, "Capteur 1", t) for ts, t in JANVIER],
+                     columns=["timestamp", "capteur", "temperature"]).to_csv(path, index=False)
+
+    assert known_appareils() == ["", "ancien", "cuisine", "labo"]
+    compact(now=datetime(2020, 6, 1))
+    for appareil in ("", "labo", "ancien"):
+        assert not os.path.exists(month_csv_path(datetime(2020, 1, 1), appareil))
+        df = read_range(datetime(2020, 1, 1), datetime(2020, 1, 1, 23, 59), appareil=appareil)
+        assert len(df) == 3
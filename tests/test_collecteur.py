@@ -0,0 +1,77 @@
+from email.message import Message
+
+import collecteur_minilide
+from collecteur_minilide import (collect, decode_page, extract_name_temp_from_html, fetch_page,
+                                 parse_appareils, parse_min_intervals, shutdown_parse_pool)
+
+PAGE_LATIN1 = "<div><h3>Congélateur</h3><span>21.5 °C</span></div>".encode("iso-8859-1")
+
+
+class FakeResponse:
+    def __init__(self, body, content_type="text/html"):
+        self.body = body
+        self.headers = Message()
+        self.headers["Content-Type"] = content_type
+
+    def read(self):
+        return self.body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_page_latin1_sans_charset(monkeypatch):
+    monkeypatch.setattr(collecteur_minilide.urllib.request, "urlopen",
+                        lambda url, timeout=None: FakeResponse(PAGE_LATIN1))
+    html = fetch_page("http://minilide")
+    assert "21.5 °C" in html
+    assert [t for _, t in extract_name_temp_from_html(html)] == [21.5]
+
+
+def test_charset_annonce_respecte():
+    assert decode_page("21,5 °C".encode("iso-8859-1"), "iso-8859-1") == "21,5 °C"
+    assert decode_page("21,5 °C".encode("utf-8"), "utf-8") == "21,5 °C"
+
+
+def test_utf8_sans_charset():
+    assert decode_page("Réfrigérateur 4 °C".encode("utf-8")) == "Réfrigérateur 4 °C"
+    # Charset inconnu : même devinette que sans charset.
+    assert decode_page(PAGE_LATIN1, "x-inconnu").endswith("21.5 °C</span></div>")
+
+
+def test_pool_analyse_reutilise(monkeypatch):
+    pages = {
+        "http://a": "<div><h3>Frigo</h3><span>4.5 °C</span></div>",
+        "http://b": "<div><h3>Étuve</h3><span>37,0 °C</span></div>",
+    }
+    monkeypatch.setattr(collecteur_minilide, "fetch_page", pages.__getitem__)
+    appareils = [("a", "http://a"), ("b", "http://b"), ("c", "http://absent")]
+    erreurs = []
+    on_error = lambda nom, e: erreurs.append(nom)
+    try:
+        releves = dict(collect(appareils, parse_workers=2, on_error=on_error))
+        pool = collecteur_minilide._parse_pool
+        assert pool is not None
+        assert [r.temperature for r in releves["a"]] == [4.5]
+        assert [r.temperature for r in releves["b"]] == [37.0]
+
+        releves = dict(collect(appareils, parse_workers=2, on_error=on_error))
+        assert collecteur_minilide._parse_pool is pool
+        assert [r.temperature for r in releves["b"]] == [37.0]
+        assert erreurs == ["c", "c"]
+    finally:
+        shutdown_parse_pool()
+
+
+def test_intervalle_minimal_par_appareil():
+    spec = "labo=http://192.168.10.107@60s, cuisine=http://u:p@192.168.10.108 ,http://10.0.0.9@2m"
+    assert parse_appareils(spec, "http://defaut") == [
+        ("labo", "http://192.168.10.107"),
+        ("cuisine", "http://u:p@192.168.10.108"),
+        ("appareil3", "http://10.0.0.9"),
+    ]
+    assert parse_min_intervals(spec) == {"labo": 60.0, "appareil3": 120.0}
+    assert parse_min_intervals(None) == {}
@@ -0,0 +1,50 @@
+import os
+from datetime import date, datetime, time, timedelta
+
+from collecteur_minilide import Releve
+from gaps_minilide import GapDetector, completeness
+
+# Récent : save() oublie les jours de plus de KEEP_DAYS.
+T0 = datetime.combine(date.today(), time(7, 0))
+PATH = os.path.join("data", "completude.json")
+
+
+def at(minutes):
+    return T0 + timedelta(minutes=minutes)
+
+
+def releves(minutes, capteurs=("Capteur 1", "Capteur 2")):
+    return [Releve("labo", at(minutes), cap, 4.0) for cap in capteurs]
+
+
+def test_releves_manques_et_capteur_muet(workdir):
+    gaps = GapDetector(PATH, stale_after_missed=2)
+    assert gaps.record_poll("labo", releves(0), at(0), at(10)) == []
+    assert gaps.record_poll("labo", releves(10, ["Capteur 1"]), at(10), at(20)) == []
+
+    # Attendu à +20 min, arrivé à +40 : deux relevés planifiés manqués.
+    events = gaps.record_poll("labo", releves(40, ["Capteur 1"]), at(40), at(50))
+    assert events[0] == f"Minilide labo : 2 relevé(s) planifié(s) manqué(s) depuis {at(20):%d/%m %H:%M}"
+    assert events[1].startswith(f"Minilide labo Capteur 2 : absent de la page depuis {T0.isoformat()}")
+    assert "(4 relevés manqués)" in events[1]
+    assert gaps.stale_sensors() == [("labo", "Capteur 2")]
+
+    assert gaps.record_poll("labo", releves(50), at(50), at(60)) == ["Minilide labo Capteur 2 : de nouveau reçu"]
+    assert gaps.stale_sensors() == []
+
+    gaps.save()
+    # Attendus / reçus : 4 relevés effectués + 2 manqués.
+    assert completeness(T0.year, T0.month, "labo", PATH) == {"*": (4, 6), "Capteur 1": (4, 6), "Capteur 2": (2, 6)}
+
+
+def test_appareil_injoignable(workdir):
+    gaps = GapDetector(PATH, stale_after_missed=2)
+    gaps.record_poll("labo", releves(0), at(0), at(10))
+    assert gaps.record_poll("labo", [], at(10), at(20)) == []
+    assert gaps.record_poll("labo", [], at(20), at(30)) == [
+        "Minilide labo : injoignable (2 relevés échoués d'affilée)"]
+    assert gaps.unreachable_devices() == ["labo"]
+    # Un appareil injoignable ne rend pas ses capteurs muets un par un.
+    assert gaps.stale_sensors() == []
+    assert gaps.record_poll("labo", releves(30), at(30), at(40)) == ["Minilide labo : de nouveau joignable"]
+    assert gaps.unreachable_devices() == []
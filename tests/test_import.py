@@ -0,0 +1,35 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from import_minilide import import_files
+from stockage_minilide import month_csv_path, read_csv_safe
+
+
+def test_virgules_decimales_et_doublons(workdir, capsys):
+    existing = month_csv_path(datetime(2020, 1, 1))
+    os.makedirs("data", exist_ok=True)
+    pd.DataFrame([("2020-01-01 07:00:00", "Capteur 1", 20.5)],
+                 columns=["timestamp", "capteur", "temperature"]).to_csv(existing, index=False)
+
+    with open("export.csv", "w", encoding="utf-8") as f:
+        f.write("horodatage;sensor;valeur\n"
+                "2020-01-01 07:00:00;Capteur 1;20,5\n"   # déjà dans la partition
+                "2020-01-01 07:30:00;Capteur 1;21,25\n"
+                "2020-01-01 07:30:00;Capteur 1;21,25\n"  # doublon dans l'export
+                "2020-01-01 07:30:00;Capteur 2;-18,0\n"
+                "2020-02-01 07:00:00;Capteur 1;19\n"
+                "2020-02-01 07:30:00;Capteur 1;n/a\n")   # illisible : rejeté
+
+    assert import_files(["export.csv"], workers=1) == 3
+    assert "1 ligne(s) rejetée(s)" in capsys.readouterr().out
+
+    janvier = read_csv_safe(existing)
+    assert janvier["temperature"].tolist() == [20.5, 21.25, -18.0]
+    assert janvier["capteur"].tolist() == ["Capteur 1", "Capteur 1", "Capteur 2"]
+    assert read_csv_safe(month_csv_path(datetime(2020, 2, 1)))["temperature"].tolist() == [19.0]
+
+    # Réimport : rien de nouveau.
+    assert import_files(["export.csv"], workers=1) == 0
+    assert len(read_csv_safe(existing)) == 3
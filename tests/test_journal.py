@@ -0,0 +1,107 @@
+from datetime import datetime
+
+import pytest
+
+import journal_minilide
+from collecteur_minilide import Releve
+from journal_minilide import JournalLocked, WriteAheadBuffer, release_lock
+from stockage_minilide import month_csv_path
+
+SEPT = [Releve("", datetime(2025, 9, 30, 23, 50), f"Capteur {i}", -20.0 - i) for i in range(1, 4)]
+OCT = [Releve("", datetime(2025, 10, 1, 0, 10), f"Capteur {i}", -21.5) for i in range(1, 4)]
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def crash(journal):
+    """Abandon du tampon sans commit, comme un processus tué."""
+    journal._journal.close()
+    release_lock(journal._lock)
+
+
+def test_commit_ecrit_les_partitions(workdir):
+    j = WriteAheadBuffer(commit_rows=100)
+    j.append(SEPT + OCT)
+    assert j.commit() == {month_csv_path(SEPT[0].timestamp): 3, month_csv_path(OCT[0].timestamp): 3}
+    j.close()
+    lines = read(month_csv_path(SEPT[0].timestamp)).splitlines()
+    assert lines[0] == "timestamp,capteur,temperature"
+    assert lines[1:] == [f"2025-09-30 23:50:00,Capteur {i},{-20.0 - i}" for i in range(1, 4)]
+    assert read("data/journal.wal") == ""
+
+
+def test_replay_commit_interrompu(workdir, monkeypatch):
+    sept_path, oct_path = month_csv_path(SEPT[0].timestamp), month_csv_path(OCT[0].timestamp)
+    j = WriteAheadBuffer(commit_rows=100)
+    j.append(SEPT[:1])
+    j.commit()
+    committed = read(sept_path)
+
+    # Arrêt brutal pendant l'écriture de la deuxième partition : les marques C
+    # sont dans le journal, la première partition est écrite, la seconde tronquée.
+    calls = []
+    real_fsync = journal_minilide._fsync
+
+    def failing_fsync(f):
+        calls.append(f.name)
+        if len(calls) == 3:
+            with open(f.name, "a", encoding="utf-8") as g:
+                g.write("2025-10-01 00:10:00,Capt")
+            raise OSError("arrêt simulé")
+        real_fsync(f)
+
+    j.append(SEPT[1:] + OCT)
+    monkeypatch.setattr(journal_minilide, "_fsync", failing_fsync)
+    with pytest.raises(OSError):
+        j.commit()
+    monkeypatch.setattr(journal_minilide, "_fsync", real_fsync)
+    crash(j)
+    assert "C," in read("data/journal.wal")
+
+    j = WriteAheadBuffer()
+    assert j.replay() == 5
+    sept, octo = read(sept_path), read(oct_path)
+    assert sept.startswith(committed)
+    assert sept.count("\n") == 1 + 3
+    assert octo.count("\n") == 1 + 3 and "Capt\n" not in octo and octo.endswith("\n")
+    for r in SEPT:
+        assert sept.count(f",{r.capteur},") == 1
+
+    # Rejouer une seconde fois ne change rien.
+    assert j.replay() == 0
+    assert (read(sept_path), read(oct_path)) == (sept, octo)
+    j.close()
+
+
+def test_replay_releves_non_commites(workdir):
+    j = WriteAheadBuffer(commit_rows=100)
+    j.append(SEPT)
+    crash(j)
+
+    j = WriteAheadBuffer()
+    assert j.replay() == 3
+    assert j.replay() == 0
+    j.close()
+    assert read(month_csv_path(SEPT[0].timestamp)).count("\n") == 1 + 3
+
+
+def test_replay_ignore_ligne_de_journal_incomplete(workdir):
+    j = WriteAheadBuffer(commit_rows=100)
+    j.append(SEPT[:2])
+    j._journal.write("R,,2025-09-30 23:50:00,Capteur 3,-2")
+    j._journal.flush()
+    crash(j)
+
+    j = WriteAheadBuffer()
+    assert j.replay() == 2
+    j.close()
+
+
+def test_un_seul_collecteur(workdir):
+    j = WriteAheadBuffer()
+    with pytest.raises(JournalLocked):
+        WriteAheadBuffer()
+    j.close()
+    WriteAheadBuffer().close()
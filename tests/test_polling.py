@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from collecteur_minilide import Releve
+from polling_minilide import AdaptivePolicy
+
+T0 = datetime(2025, 9, 1, 7, 0)
+PLAGES = {"Capteur 1": (0.0, 10.0)}
+
+
+def plage(capteur, position, appareil=""):
+    return PLAGES.get(capteur)
+
+
+def releve(appareil, temp, minutes=0):
+    return [Releve(appareil, T0 + timedelta(minutes=minutes), "Capteur 1", temp)]
+
+
+def test_intervalle_minimal_par_appareil():
+    policy = AdaptivePolicy(plage, base=3600, fast=10, min_interval=30,
+                            min_intervals={"congelateur": 120})
+    # Hors plage : urgence 1, l'intervalle descend jusqu'au minimum de l'appareil.
+    assert policy.observe("congelateur", releve("congelateur", 12.0), now=0).interval == 120
+    assert policy.observe("labo", releve("labo", 12.0), now=0).interval == 30
+
+
+def test_acceleration_immediate_puis_ralentissement_progressif():
+    policy = AdaptivePolicy(plage, base=3600, fast=60, min_interval=30)
+    assert policy.observe("labo", releve("labo", 5.0, 0), now=0) == (3600, 0.0, "base")
+    assert policy.observe("labo", releve("labo", 12.0, 60), now=3600).interval == 60
+
+    # Revenu au milieu de la plage : x2 par relevé jusqu'au rythme de base.
+    intervals, now = [], 3600
+    for k in range(7):
+        now += 60
+        decision = policy.observe("labo", releve("labo", 5.0, 120 + 60 * k), now=now)
+        intervals.append(decision.interval)
+    assert intervals == [120, 240, 480, 960, 1920, 3600, 3600]
+    assert decision.raison == "base"
+
+
+def test_variation_rapide_et_echec():
+    policy = AdaptivePolicy(plage, base=3600, fast=60, min_interval=30, fast_rate=0.2)
+    policy.observe("labo", releve("labo", 5.0, 0), now=0)
+    # +0,1 °C/min : la moitié du seuil de variation rapide.
+    decision = policy.observe("labo", releve("labo", 6.0, 10), now=600)
+    assert decision.raison == "variation_rapide" and decision.urgency == 0.5
+    assert decision.interval == 3600 - (3600 - 60) * 0.5
+
+    # Échec : le rythme est conservé, l'appareil n'est pas sollicité davantage.
+    assert policy.observe("labo", [], now=700) == (decision.interval, 0.0, "echec")
+
+
+def test_due_et_attente():
+    policy = AdaptivePolicy(plage, base=3600, fast=60, min_interval=30)
+    appareils = [("labo", "http://labo"), ("cuisine", "http://cuisine")]
+    # Jamais interrogés : dus tout de suite.
+    assert policy.due(appareils, now=0) == appareils
+    policy.observe("labo", releve("labo", 12.0), now=0)
+    policy.observe("cuisine", releve("cuisine", 5.0), now=0)
+    assert policy.due(appareils, now=30) == []
+    assert policy.seconds_until_next(appareils, now=30) == 30
+    assert policy.due(appareils, now=60) == [("labo", "http://labo")]
@@ -0,0 +1,20 @@
+import pytest
+
+from profiling_minilide import _modes
+
+
+@pytest.mark.parametrize("argv, env, attendu", [
+    ([], "", set()),
+    ([], "mem", {"mem"}),
+    (["--profile"], "", {"cpu", "mem"}),
+    (["--profile"], "mem", {"mem"}),
+    (["--profile=cpu"], "mem", {"cpu"}),
+    (["--profile", "cpu"], "", {"cpu"}),
+    (["--profile", "mem,cpu"], "", {"cpu", "mem"}),
+    # L'argument suivant n'est pas un mode : il appartient au script.
+    (["--profile", "export.csv"], "", {"cpu", "mem"}),
+    (["export.csv", "--profile=all"], "", {"cpu", "mem"}),
+])
+def test_option_profile(monkeypatch, argv, env, attendu):
+    monkeypatch.setenv("MINILIDE_PROFILE", env)
+    assert _modes(argv) == attendu
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from collecteur_minilide import Releve
+from ring_minilide import RingReader, RingWriter
+
+T0 = datetime(2025, 9, 1, 7, 0)
+
+
+def releves(k, capteurs=("Capteur 1", "Capteur 2"), appareil="labo"):
+    ts = T0 + timedelta(minutes=15 * k)
+    return [Releve(appareil, ts, cap, float(k + i)) for i, cap in enumerate(capteurs)]
+
+
+def test_ecriture_reouverture_lecture(workdir):
+    w = RingWriter(slots=8, history=4)
+    assert w.write(releves(0)) == 2
+    w.close()
+
+    w = RingWriter(slots=8, history=4)
+    for k in range(1, 6):
+        w.write(releves(k))
+    w.close()
+
+    r = RingReader.open()
+    assert r is not None
+    history = {cap: points for _, cap, points in r.history_by_sensor("labo")}
+    # Anneau de 4 : les relevés 2 à 5, du plus ancien au plus récent.
+    assert history["Capteur 1"] == [(T0 + timedelta(minutes=15 * k), float(k)) for k in range(2, 6)]
+    assert r.latest("labo") == [("labo", "Capteur 1", T0 + timedelta(minutes=75), 5.0),
+                                ("labo", "Capteur 2", T0 + timedelta(minutes=75), 6.0)]
+    assert r.history_by_sensor("autre") == []
+    r.close()
+
+
+def test_sequence_change_a_chaque_ecriture(workdir):
+    w = RingWriter(slots=8, history=4)
+    r = RingReader.open()
+    before = r.sequence
+    w.write(releves(0))
+    assert r.sequence == before + 1
+    w.write([])
+    assert r.sequence == before + 1
+    r.close()
+    w.close()
+
+
+def test_nom_long_garde_son_emplacement(workdir):
+    long_name = "Congélateur é" * 5  # plus de 48 octets en UTF-8
+    for k in range(3):
+        w = RingWriter(slots=2, history=8)
+        assert w.write(releves(k, capteurs=(long_name,))) == 1
+        w.close()
+
+    r = RingReader.open()
+    slots = r.history_by_sensor()
+    r.close()
+    assert len(slots) == 1
+    assert long_name.startswith(slots[0][1])
+    assert [t for _, t in slots[0][2]] == [0.0, 1.0, 2.0]
+
+
+def test_noms_identiques_une_fois_tronques(workdir, capsys):
+    base = "x" * 48
+    w = RingWriter(slots=4, history=4)
+    assert w.write(releves(0, capteurs=(base + "A", base + "B"))) == 1
+    w.close()
+    assert "même nom tronqué" in capsys.readouterr().out
+
+
+def test_anneau_plein(workdir, capsys):
+    w = RingWriter(slots=2, history=4)
+    assert w.write(releves(0, capteurs=("Capteur 1", "Capteur 2", "Capteur 3"))) == 2
+    w.close()
+    assert "Anneau plein" in capsys.readouterr().out
+
+
+def test_lecteur_sans_anneau(workdir):
+    assert RingReader.open() is None